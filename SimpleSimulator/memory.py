@@ -0,0 +1,290 @@
+# Memory models of the simulator: contiguous little-endian byte regions (Memory), or a sparse
+# 32-bit address space made of pages allocated on their first store (PagedMemory)
+import struct
+
+# Packers used to access words and halfwords inside a region
+WORD = struct.Struct("<I")
+HALF = struct.Struct("<H")
+
+# Default size of the pages of a PagedMemory, as a power of two (4 KiB)
+PAGE_BITS = 12
+
+# Size of the address space of the simulator
+ADDRESS_SPACE = 1 << 32
+
+# Exception raised when an access falls outside every mapped region or is not permitted there
+class MemoryFault(Exception):
+    def __init__(self, address, is_store):
+        self.address = address
+        self.is_store = is_store
+        action = "store at" if is_store else "load from"
+        super().__init__(f"Invalid memory address to {action}: 0x{address:08X}")
+
+# A contiguous block of memory starting at base and spanning size bytes, holding its own bytes
+# unless allocate is False (the regions of a PagedMemory only carry permissions)
+class Region:
+    def __init__(self, name, base, size, writable=True, readable=True, allocate=True):
+        self.name = name
+        self.base = base
+        self.size = size
+        self.end = base + size
+        self.writable = writable
+        self.readable = readable
+        self.data = bytearray(size) if allocate else None
+        self.view = memoryview(self.data) if allocate else None
+        # Optional callback invoked with the address of every store into the region
+        self.on_store = None
+
+# The address space of the simulator, searched region by region in the order they were mapped
+class Memory:
+    def __init__(self):
+        self.regions = []
+
+    # Function to map a new zero-filled region and return it
+    def add_region(self, name, base, size, writable=True, readable=True):
+        region = Region(name, base, size, writable, readable)
+        self.regions.append(region)
+        return region
+
+    # Function to unmap the region with the given name
+    def remove_region(self, name):
+        self.regions.remove(self.region(name))
+
+    # Function to get a mapped region by its name
+    def region(self, name):
+        for region in self.regions:
+            if region.name == name:
+                return region
+        raise KeyError(name)
+
+    # Function to find the region holding size bytes at address, faulting when there is none
+    # or when the region does not permit the access
+    def find(self, address, size, is_store=False):
+        for region in self.regions:
+            if region.base <= address and address + size <= region.end:
+                if not (region.writable if is_store else region.readable):
+                    break
+                return region
+        raise MemoryFault(address, is_store)
+
+    def load_word(self, address):
+        region = self.find(address, 4)
+        return WORD.unpack_from(region.data, address - region.base)[0]
+
+    def load_half(self, address):
+        region = self.find(address, 2)
+        return HALF.unpack_from(region.data, address - region.base)[0]
+
+    def load_byte(self, address):
+        region = self.find(address, 1)
+        return region.data[address - region.base]
+
+    def store_word(self, address, value):
+        region = self.find(address, 4, True)
+        WORD.pack_into(region.data, address - region.base, value & 0xFFFFFFFF)
+        if region.on_store is not None:
+            region.on_store(address)
+
+    def store_half(self, address, value):
+        region = self.find(address, 2, True)
+        HALF.pack_into(region.data, address - region.base, value & 0xFFFF)
+        if region.on_store is not None:
+            region.on_store(address)
+
+    def store_byte(self, address, value):
+        region = self.find(address, 1, True)
+        region.data[address - region.base] = value & 0xFF
+        if region.on_store is not None:
+            region.on_store(address)
+
+    # Function to copy raw bytes into memory starting at address, read-only regions included
+    def write_bytes(self, address, data):
+        region = self.find(address, len(data))
+        offset = address - region.base
+        region.view[offset:offset + len(data)] = data
+
+    # Function to read count consecutive words starting at address
+    def dump_words(self, address, count):
+        region = self.find(address, 4 * count)
+        offset = address - region.base
+        return list(struct.unpack_from(f"<{count}I", region.data, offset))
+
+    # Function to list the bytes of every region as (base address, buffer) pairs, without copying them
+    def page_buffers(self):
+        return [(region.base, region.data) for region in self.regions]
+
+    # Function to overwrite the regions with the bytes of a {base address: bytes} mapping, which must
+    # hold exactly one page per region of the same size (a checkpoint taken with the same memory layout)
+    def load_pages(self, pages):
+        sizes = {region.base: region.size for region in self.regions}
+        for address, data in pages.items():
+            if sizes.get(address) != len(data):
+                raise ValueError(f"page at 0x{address:08X} of {len(data)} bytes does not match the flat memory layout")
+        for region in self.regions:
+            if region.base in pages:
+                region.data[:] = pages[region.base]
+
+# Sparse memory covering the whole 32-bit address space with fixed-size pages, allocated on their
+# first store (untouched pages read as zeros). Regions only carry permissions here: the first region
+# holding an access decides whether it is permitted, and accesses outside every region get the
+# default permissions given to the constructor. Accesses within one page of no region take a fast
+# path that skips the permission checks, so addresses must already be unsigned 32-bit values.
+class PagedMemory:
+    def __init__(self, readable=True, writable=True, page_bits=PAGE_BITS):
+        self.readable = readable
+        self.writable = writable
+        self.page_bits = page_bits
+        self.page_size = 1 << page_bits
+        self.page_mask = self.page_size - 1
+        # Allocated pages keyed by page number
+        self.pages = {}
+        self.regions = []
+        self.update_restricted()
+
+    # Function to map a region of permissions and return it
+    def add_region(self, name, base, size, writable=True, readable=True):
+        region = Region(name, base, size, writable, readable, allocate=False)
+        self.regions.append(region)
+        self.update_restricted()
+        return region
+
+    def remove_region(self, name):
+        self.regions.remove(self.region(name))
+        self.update_restricted()
+
+    def region(self, name):
+        for region in self.regions:
+            if region.name == name:
+                return region
+        raise KeyError(name)
+
+    # Function to compute the pages whose accesses must check permissions: the pages overlapped by
+    # a region, or every page when the default permissions do not allow everything
+    def update_restricted(self):
+        bits = self.page_bits
+        if not (self.readable and self.writable):
+            self.restricted = range(ADDRESS_SPACE >> bits)
+            return
+        self.restricted = {page for region in self.regions if region.size
+                           for page in range(region.base >> bits, ((region.end - 1) >> bits) + 1)}
+
+    # Function to check the permissions of an access of size bytes at address, returning the
+    # region holding it (None outside every region) and faulting when the access is not permitted
+    def check(self, address, size, is_store):
+        if address < 0 or address + size > ADDRESS_SPACE:
+            raise MemoryFault(address, is_store)
+        for region in self.regions:
+            if region.base <= address and address + size <= region.end:
+                allowed = region.writable if is_store else region.readable
+                break
+        else:
+            region = None
+            allowed = self.writable if is_store else self.readable
+        if not allowed:
+            raise MemoryFault(address, is_store)
+        return region
+
+    # Function to get the page holding address, allocating it when it was never written
+    def page(self, address):
+        number = address >> self.page_bits
+        data = self.pages.get(number)
+        if data is None:
+            data = self.pages[number] = bytearray(self.page_size)
+        return data
+
+    # Function to load size bytes after checking the permissions, for accesses crossing
+    # a page boundary or falling in a restricted page
+    def load(self, address, size):
+        self.check(address, size, False)
+        return self.read_bytes(address, size)
+
+    # Function to store bytes after checking the permissions and notify the region holding them
+    def store(self, address, data):
+        region = self.check(address, len(data), True)
+        self.write_bytes(address, data)
+        if region is not None and region.on_store is not None:
+            region.on_store(address)
+
+    def load_word(self, address):
+        offset = address & self.page_mask
+        if address >> self.page_bits in self.restricted or offset > self.page_size - 4:
+            return WORD.unpack(self.load(address, 4))[0]
+        data = self.pages.get(address >> self.page_bits)
+        return WORD.unpack_from(data, offset)[0] if data is not None else 0
+
+    def load_half(self, address):
+        offset = address & self.page_mask
+        if address >> self.page_bits in self.restricted or offset > self.page_size - 2:
+            return HALF.unpack(self.load(address, 2))[0]
+        data = self.pages.get(address >> self.page_bits)
+        return HALF.unpack_from(data, offset)[0] if data is not None else 0
+
+    def load_byte(self, address):
+        if address >> self.page_bits in self.restricted:
+            return self.load(address, 1)[0]
+        data = self.pages.get(address >> self.page_bits)
+        return data[address & self.page_mask] if data is not None else 0
+
+    def store_word(self, address, value):
+        offset = address & self.page_mask
+        if address >> self.page_bits in self.restricted or offset > self.page_size - 4:
+            self.store(address, WORD.pack(value & 0xFFFFFFFF))
+        else:
+            WORD.pack_into(self.page(address), offset, value & 0xFFFFFFFF)
+
+    def store_half(self, address, value):
+        offset = address & self.page_mask
+        if address >> self.page_bits in self.restricted or offset > self.page_size - 2:
+            self.store(address, HALF.pack(value & 0xFFFF))
+        else:
+            HALF.pack_into(self.page(address), offset, value & 0xFFFF)
+
+    def store_byte(self, address, value):
+        if address >> self.page_bits in self.restricted:
+            self.store(address, bytes((value & 0xFF,)))
+        else:
+            self.page(address)[address & self.page_mask] = value & 0xFF
+
+    # Function to read size raw bytes starting at address without allocating pages
+    def read_bytes(self, address, size):
+        chunks = []
+        while size > 0:
+            offset = address & self.page_mask
+            length = min(size, self.page_size - offset)
+            data = self.pages.get(address >> self.page_bits)
+            chunks.append(data[offset:offset + length] if data is not None else bytes(length))
+            address += length
+            size -= length
+        return b"".join(chunks)
+
+    # Function to copy raw bytes into memory starting at address, whatever the permissions
+    def write_bytes(self, address, data):
+        if address < 0 or address + len(data) > ADDRESS_SPACE:
+            raise MemoryFault(address, True)
+        position = 0
+        while position < len(data):
+            offset = address & self.page_mask
+            length = min(len(data) - position, self.page_size - offset)
+            self.page(address)[offset:offset + length] = data[position:position + length]
+            address += length
+            position += length
+
+    def dump_words(self, address, count):
+        return list(struct.unpack(f"<{count}I", self.read_bytes(address, 4 * count)))
+
+    # Function to list the allocated pages as (base address, bytes) pairs in address order
+    def touched_pages(self):
+        return [(number << self.page_bits, bytes(self.pages[number])) for number in sorted(self.pages)]
+
+    # Function to list the allocated pages as (base address, buffer) pairs, without copying them
+    def page_buffers(self):
+        return [(number << self.page_bits, data) for number, data in self.pages.items()]
+
+    # Function to replace every page with the bytes of a {base address: bytes} mapping, which must hold
+    # whole pages of this memory (a checkpoint taken with the same page size)
+    def load_pages(self, pages):
+        page_size = 1 << self.page_bits
+        for address, data in pages.items():
+            if address % page_size or len(data) != page_size:
+                raise ValueError(f"page at 0x{address:08X} of {len(data)} bytes does not match {page_size}-byte pages")
+        self.pages = {address >> self.page_bits: bytearray(data) for address, data in pages.items()}
@@ -0,0 +1,194 @@
+# Opt-in microarchitecture model of a Simulator: set-associative instruction and data caches with
+# LRU replacement, a bimodal or gshare branch predictor, and an estimate of the cycles per instruction
+# a simple in-order pipeline would take. Like the profiler, a modelled machine executes its
+# instructions one by one through the interpreter, while unmodelled runs keep their usual code path.
+import argparse
+import json
+from translator import LOAD_OPS, STORE_OPS, BRANCH_OPS, BRANCH_CONDITIONS
+
+# Mask keeping addresses within 32 bits
+MASK_32 = 0xFFFFFFFF
+
+# Default geometries of the caches as (size in bytes, ways, line size in bytes)
+DEFAULT_ICACHE = (1024, 2, 16)
+DEFAULT_DCACHE = (1024, 2, 16)
+
+# Default branch predictor and its number of 2-bit counters
+DEFAULT_PREDICTOR = "gshare"
+DEFAULT_PREDICTOR_ENTRIES = 1024
+
+# Default cycles lost on a cache miss and on a mispredicted branch or an indirect jump
+DEFAULT_MISS_PENALTY = 20
+DEFAULT_MISPREDICT_PENALTY = 3
+
+# A set-associative cache of size bytes, keeping for every set the tags of its lines from the least
+# to the most recently used. Only hits and misses are modelled, stores allocate their line like loads.
+class Cache:
+    def __init__(self, name, size, ways, line_size):
+        if size <= 0 or ways <= 0 or line_size <= 0 or size % (ways * line_size):
+            raise ValueError(f"{name}: size {size} is not a multiple of {ways} ways of {line_size}-byte lines")
+        self.name = name
+        self.size = size
+        self.ways = ways
+        self.line_size = line_size
+        self.set_count = size // (ways * line_size)
+        self.sets = [[] for _ in range(self.set_count)]
+        self.hits = 0
+        self.misses = 0
+
+    # Function to look up the line holding address, filling it on a miss, and return whether it hit
+    def access(self, address):
+        line = address // self.line_size
+        tags = self.sets[line % self.set_count]
+        tag = line // self.set_count
+        if tag in tags:
+            tags.remove(tag)
+            tags.append(tag)
+            self.hits += 1
+            return True
+        if len(tags) == self.ways:
+            del tags[0]
+        tags.append(tag)
+        self.misses += 1
+        return False
+
+    def report(self):
+        accesses = self.hits + self.misses
+        return {"size": self.size, "ways": self.ways, "line_size": self.line_size, "sets": self.set_count,
+                "accesses": accesses, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / accesses if accesses else 0}
+
+# Branch predictor made of 2-bit saturating counters, indexed by the PC (bimodal) or by the PC
+# xor the global history of the last branch outcomes (gshare)
+class BranchPredictor:
+    def __init__(self, kind=DEFAULT_PREDICTOR, entries=DEFAULT_PREDICTOR_ENTRIES):
+        if kind not in ("bimodal", "gshare"):
+            raise ValueError(f"unknown branch predictor '{kind}'")
+        if entries <= 0 or entries & (entries - 1):
+            raise ValueError(f"branch predictor entries must be a power of two, not {entries}")
+        self.kind = kind
+        self.entries = entries
+        # Counters start weakly not taken
+        self.counters = [1] * entries
+        self.history = 0
+        self.predictions = 0
+        self.mispredictions = 0
+
+    # Function to predict the branch at pc, train the predictor with its outcome and return whether
+    # the prediction was right
+    def update(self, pc, taken):
+        index = pc >> 2
+        if self.kind == "gshare":
+            index ^= self.history
+        index &= self.entries - 1
+        counter = self.counters[index]
+        correct = (counter >= 2) == taken
+        self.counters[index] = min(counter + 1, 3) if taken else max(counter - 1, 0)
+        self.history = ((self.history << 1) | taken) & (self.entries - 1)
+        self.predictions += 1
+        if not correct:
+            self.mispredictions += 1
+        return correct
+
+    def report(self):
+        return {"kind": self.kind, "entries": self.entries, "branches": self.predictions,
+                "mispredictions": self.mispredictions,
+                "accuracy": 1 - self.mispredictions / self.predictions if self.predictions else None}
+
+# Model of the pipeline of a Simulator: every instruction takes one cycle, plus miss_penalty cycles
+# for every cache miss of its fetch or of its load or store, plus mispredict_penalty cycles when it
+# is a mispredicted branch or a jalr (there is no target predictor, jal targets are known at decode)
+class PerformanceModel:
+    def __init__(self, sim, icache=DEFAULT_ICACHE, dcache=DEFAULT_DCACHE, predictor=DEFAULT_PREDICTOR,
+                 predictor_entries=DEFAULT_PREDICTOR_ENTRIES, miss_penalty=DEFAULT_MISS_PENALTY,
+                 mispredict_penalty=DEFAULT_MISPREDICT_PENALTY):
+        self.sim = sim
+        self.icache = Cache("icache", *icache)
+        self.dcache = Cache("dcache", *dcache)
+        self.predictor = BranchPredictor(predictor, predictor_entries)
+        self.miss_penalty = miss_penalty
+        self.mispredict_penalty = mispredict_penalty
+        self.instructions = 0
+        self.cycles = 0
+        self.jumps = 0
+
+    # Function to execute and model instructions until the machine stops or max_steps of them ran
+    # (None means no limit), returning the number of instructions executed
+    def run(self, max_steps=None):
+        sim = self.sim
+        registers = sim.registers
+        fetch = self.icache.access
+        data = self.dcache.access
+        predict = self.predictor.update
+        count = 0
+        cycles = 0
+
+        while not sim.stopped and (max_steps is None or count < max_steps):
+            pc = sim.pc
+            inst = sim.instr_mem[pc >> 2] if pc >= 0 and not pc & 3 else sim.halt_inst
+            name = inst.mnemonic
+            cycles += 1
+            if not fetch(pc & MASK_32):
+                cycles += self.miss_penalty
+            if (name in LOAD_OPS or name in STORE_OPS) and not data((registers[inst.rs1] + inst.imm) & MASK_32):
+                cycles += self.miss_penalty
+            if name in BRANCH_OPS:
+                # The outcome comes from the condition, a taken branch may well jump to pc + 4
+                taken = BRANCH_CONDITIONS[name](registers[inst.rs1], registers[inst.rs2])
+
+            if not sim.interpret(1):
+                break
+            count += 1
+            if name in BRANCH_OPS and not sim.halted:
+                if not predict(pc, taken):
+                    cycles += self.mispredict_penalty
+            elif name == "jalr":
+                self.jumps += 1
+                cycles += self.mispredict_penalty
+
+        self.instructions += count
+        self.cycles += cycles
+        return count
+
+    # Function to gather the counters into a dictionary ready to be written as JSON
+    def report(self):
+        return {
+            "instructions": self.instructions,
+            "cycles": self.cycles,
+            "cpi": self.cycles / self.instructions if self.instructions else 0,
+            "miss_penalty": self.miss_penalty,
+            "mispredict_penalty": self.mispredict_penalty,
+            "icache": self.icache.report(),
+            "dcache": self.dcache.report(),
+            "predictor": self.predictor.report(),
+            "indirect_jumps": self.jumps,
+        }
+
+    # Function to describe the report in a few lines for the terminal
+    def summary(self):
+        report = self.report()
+        icache, dcache, predictor = report["icache"], report["dcache"], report["predictor"]
+        accuracy = f"{predictor['accuracy']:.1%}" if predictor["accuracy"] is not None else "n/a"
+        return "\n".join([
+            f"instructions {report['instructions']}, cycles {report['cycles']}, CPI {report['cpi']:.3f}",
+            f"icache {icache['hits']}/{icache['accesses']} hits ({icache['hit_rate']:.1%})",
+            f"dcache {dcache['hits']}/{dcache['accesses']} hits ({dcache['hit_rate']:.1%})",
+            f"{predictor['kind']} predictor {predictor['mispredictions']}/{predictor['branches']} mispredicted "
+            f"({accuracy} accuracy), {report['indirect_jumps']} indirect jumps",
+        ])
+
+    def write_report(self, path):
+        with open(path, "w") as f_out:
+            json.dump(self.report(), f_out, indent=2)
+
+# Function to parse a cache geometry given as SIZE,WAYS,LINE on the command line
+def parse_cache(text):
+    try:
+        size, ways, line_size = (int(part, 0) for part in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected SIZE,WAYS,LINE in bytes, got '{text}'")
+    try:
+        Cache("cache", size, ways, line_size)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return size, ways, line_size
@@ -0,0 +1,117 @@
+# Opt-in instrumentation of a Simulator: dynamic instruction mix, per-PC execution counts,
+# branch outcomes, memory accesses by region and host time per step. A profiled machine
+# executes its instructions one by one through the interpreter (never through translated
+# blocks) so every step can be attributed, while unprofiled runs keep their usual code path.
+import csv
+import json
+import time
+from collections import Counter, defaultdict
+from translator import LOAD_OPS, STORE_OPS, BRANCH_OPS, BRANCH_CONDITIONS
+
+# Mask keeping addresses within 32 bits
+MASK_32 = 0xFFFFFFFF
+
+# Counters collected over every run of a Simulator
+class Profiler:
+    def __init__(self, sim):
+        self.sim = sim
+        self.steps = 0
+        self.elapsed_ns = 0
+        self.mix = Counter()
+        self.host_ns = Counter()
+        self.pcs = Counter()
+        # Branch outcomes keyed by PC as [taken, not taken]
+        self.branches = defaultdict(lambda: [0, 0])
+        # Memory accesses keyed by address, attributed to regions when the report is built
+        self.loads = Counter()
+        self.stores = Counter()
+
+    # Function to execute and record instructions until the machine stops or max_steps of them ran
+    # (None means no limit), returning the number of instructions executed
+    def run(self, max_steps=None):
+        sim = self.sim
+        registers = sim.registers
+        clock = time.perf_counter_ns
+        count = 0
+        started = clock()
+
+        while not sim.stopped and (max_steps is None or count < max_steps):
+            pc = sim.pc
+            inst = sim.instr_mem[pc >> 2] if pc >= 0 and not pc & 3 else sim.halt_inst
+            name = inst.mnemonic
+            if name in LOAD_OPS:
+                self.loads[(registers[inst.rs1] + inst.imm) & MASK_32] += 1
+            elif name in STORE_OPS:
+                self.stores[(registers[inst.rs1] + inst.imm) & MASK_32] += 1
+            elif name in BRANCH_OPS:
+                # The outcome comes from the condition, a taken branch may well jump to pc + 4
+                taken = BRANCH_CONDITIONS[name](registers[inst.rs1], registers[inst.rs2])
+
+            before = clock()
+            if not sim.interpret(1):
+                break
+            self.host_ns[name] += clock() - before
+            count += 1
+            self.mix[name] += 1
+            self.pcs[pc] += 1
+            if name in BRANCH_OPS and not sim.halted:
+                self.branches[pc][0 if taken else 1] += 1
+
+        self.elapsed_ns += clock() - started
+        self.steps += count
+        return count
+
+    # Function to name the region holding an address, as the memory searches them
+    def region_name(self, address):
+        for region in self.sim.memory.regions:
+            if region.base <= address < region.end:
+                return region.name
+        return "unmapped"
+
+    # Function to gather the counters into a dictionary ready to be written as JSON
+    def report(self):
+        memory = defaultdict(lambda: {"loads": 0, "stores": 0})
+        for address, count in self.loads.items():
+            memory[self.region_name(address)]["loads"] += count
+        for address, count in self.stores.items():
+            memory[self.region_name(address)]["stores"] += count
+
+        instr_mem = self.sim.instr_mem
+        return {
+            "steps": self.steps,
+            "elapsed_ns": self.elapsed_ns,
+            "ns_per_step": self.elapsed_ns / self.steps if self.steps else 0,
+            "mix": {name: {"count": count, "host_ns_per_step": self.host_ns[name] / count}
+                    for name, count in self.mix.most_common()},
+            "pcs": {f"0x{pc:08X}": {"count": count,
+                                    "mnemonic": instr_mem[pc >> 2].mnemonic if 0 <= pc < 4 * len(instr_mem) and not pc & 3 else "halt"}
+                    for pc, count in self.pcs.most_common()},
+            "branches": {f"0x{pc:08X}": {"taken": taken, "not_taken": not_taken,
+                                         "taken_ratio": taken / (taken + not_taken)}
+                         for pc, (taken, not_taken) in sorted(self.branches.items())},
+            "memory": dict(memory),
+        }
+
+    # Function to write the report as JSON, or as CSV rows of (section, key, count, detail)
+    # when the path ends with .csv
+    def write_report(self, path):
+        report = self.report()
+        if not path.lower().endswith(".csv"):
+            with open(path, "w") as f_out:
+                json.dump(report, f_out, indent=2)
+            return
+
+        with open(path, "w", newline="") as f_out:
+            writer = csv.writer(f_out)
+            writer.writerow(["section", "key", "count", "detail"])
+            writer.writerow(["summary", "steps", report["steps"], ""])
+            writer.writerow(["summary", "ns_per_step", "", f"{report['ns_per_step']:.1f}"])
+            for name, entry in report["mix"].items():
+                writer.writerow(["mix", name, entry["count"], f"{entry['host_ns_per_step']:.1f}"])
+            for pc, entry in report["pcs"].items():
+                writer.writerow(["pc", pc, entry["count"], entry["mnemonic"]])
+            for pc, entry in report["branches"].items():
+                writer.writerow(["branch", pc, entry["taken"] + entry["not_taken"], f"{entry['taken_ratio']:.3f}"])
+            for name, entry in report["memory"].items():
+                writer.writerow(["load", name, entry["loads"], ""])
+                writer.writerow(["store", name, entry["stores"], ""])
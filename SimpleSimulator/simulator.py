@@ -1,276 +1,828 @@
 # Importing necessary libraries for file handling and system operations
+import argparse
+import mmap
+import os
+import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from memory import ADDRESS_SPACE, Memory, PagedMemory, MemoryFault, WORD
+from trace_writer import TextTraceWriter, BinaryTraceWriter, DeltaTraceWriter, COMPRESSIONS, KEYFRAME_INTERVAL
+from translator import Translator
+from profiler import Profiler
+from microarch import (PerformanceModel, parse_cache, DEFAULT_ICACHE, DEFAULT_DCACHE, DEFAULT_PREDICTOR,
+                       DEFAULT_PREDICTOR_ENTRIES, DEFAULT_MISS_PENALTY, DEFAULT_MISPREDICT_PENALTY)
+from checkpoint import Checkpoint, DEFAULT_INTERVAL, find_checkpoint, program_hash, run_checkpointed
 
-# Defining the opcode mappings for different instruction types
-op_code_r = {"add": "0110011", "sub": "0110011", "slt": "0110011", "srl": "0110011", "and": "0110011", "or": "0110011"}
-op_code_i = {"lw": "0000011", "addi": "0010011", "jalr": "1100111"}
-op_code_s = {"sw": "0100011"}
-op_code_b = {"beq": "1100011", "bne": "1100011"}
-op_code_j = {"jal": "1101111"}
-
-# Initializing registers with their binary representations and default values
-registers = {"00000": 0, "00001": 0, "00010": 380, "00011": 0, "00100": 0, "00101": 0, "00110": 0, "00111": 0, "01000": 0, "01001": 0, "01010": 0, "01011": 0, "01100": 0, "01101": 0, "01110": 0, "01111": 0, "10000": 0, "10001": 0, "10010": 0, "10011": 0, "10100": 0, "10101": 0, "10110": 0, "10111": 0, "11000": 0, "11001": 0, "11010": 0, "11011": 0, "11100": 0, "11101": 0, "11110": 0, "11111": 0}
-
-# Function to convert a number to its binary representation
-def convert_to_binary(num, bit_length):
-    # If he number is negative, convert it to its two's complement representation
-    if num < 0:
-        num += (1 << bit_length)
-    return format(num, f'0{bit_length}b')
-
-# Defining the memory spaces for data
-data_mem = {}
-for addr in range(0, 128, 4):
-    data_mem[f'0x{(0x00010000 + addr):08X}'] = 0
-
-# Defining the memory spaces for stack
-stack_mem = {}
-for addr in range(0, 128, 4):
-    stack_mem[f'0x{(0x00000100 + addr):08X}'] = 0
-
-# Assigning input and output file names from command line arguments
-input_file = sys.argv[1]
-output_file = sys.argv[2]
-
-# Opening the input file for reading the data inside it by splitting it on the basis of next line
-with open(input_file, "r") as f_in:
-    lines = f_in.read().split("\n")
-
-# Opening the output file for writing the data inside it
-file_oi = open(output_file, "w")
-
-# Opening the trace file for writing the data inside it
-trace_file = "trace.txt" if len(sys.argv) < 4 else sys.argv[3]
-file_trace = open(trace_file, "w")
-
-# Initializing the program counter and count for iteration
-PC = 0
-count = 0
-
-# Function to convert binary address to hexadecimal format
-def binary_to_hexa(binary_val):
-    int_val = int(binary_val, 2)
-    return f'0x{int_val:08X}'
-
-# Function to process the immediate value from the instruction
-def process_imm(bin_imm):
-    if bin_imm[0] == '1':
-        inverted = ''.join('1' if bit == '0' else '0' for bit in bin_imm)
-        pos_val = int(inverted, 2) + 1
-        return -pos_val
-    else:
-        return int(bin_imm, 2)
-
-# Function to format the register values for output presentation
-def form_reg(reg_values):
-    form_val = []
-
-    # Iterating through the register values and converting them to binary representation
-    for val in reg_values:
-        if val < 0:
-            val_32bit = (1 << 32) + val
-            binary_rep = bin(val_32bit)[2:].zfill(32)
-        else:
-            binary_rep = bin(val)[2:].zfill(32)
-        form_val.append('0b' + binary_rep)
-    return form_val
-
-# Reading the instructions from the input file and storing them in instruction memory
-instr_mem = {}
-for i, line in enumerate(lines):
-    if line.strip():
-        instr_mem[i*4] = line.strip()
-
-# Loop to execute the instructions
-while PC < len(lines) * 4:
-    count += 1
-
-    # If the count exceeds 100, break the loop to prevent infinite execution
-    if count > 100:
-        break
-
-    curr_inst = instr_mem.get(PC, "00000000000000000000000001100011")
-    
-    # If the instruction is empty, break the loop and write the values to the output file
-    if curr_inst == "00000000000000000000000001100011":
-        registers["00000"] = 0
-        
-        reg_values = [PC]
-        for reg_key in sorted(registers.keys()):
-            reg_values.append(registers[reg_key])
-        form_val = form_reg(reg_values)
-        file_oi.write(" ".join(form_val) + "\n")
-        
-        reg_values = [PC]
-        for reg_key in sorted(registers.keys()):
-            reg_values.append(registers[reg_key])
-        file_trace.write(" ".join(str(val) for val in reg_values) + "\n")
-        
-        break
-      
-    # If the instruction is not empty, check if it is a r-type instruction
-    elif curr_inst[-7:] == "0110011":
-        opcode = curr_inst[-7:]
-        
-        # Extracting the funct3 and funct7 fields from the instruction
-        funct3 = curr_inst[-15:-12]
-        funct7 = curr_inst[-32:-25]
-
-        # Extracting the source and destination registers from the instruction
-        rs1 = curr_inst[-20:-15]
-        rs2 = curr_inst[-25:-20]
-        rd = curr_inst[-12:-7]
-
-        # Performing the operation based on the funct3 and funct7 values
-        if funct3 == '000' and funct7 == '0000000':
-            registers[rd] = registers[rs1] + registers[rs2]
-        elif funct3 == '000' and funct7 == '0100000':
-            registers[rd] = registers[rs1] - registers[rs2]
-        elif funct3 == '010' and funct7 == '0000000':
-            registers[rd] = 1 if registers[rs1] < registers[rs2] else 0
-        elif funct3 == '101' and funct7 == '0000000':
-            registers[rd] = registers[rs1] >> registers[rs2]
-        elif funct3 == '111' and funct7 == '0000000':
-            registers[rd] = registers[rs1] & registers[rs2]
-        elif funct3 == '110' and funct7 == '0000000':
-            registers[rd] = registers[rs1] | registers[rs2]
-            
-        PC += 4
-        registers["00000"] = 0
-
-    # Check if the instruction is an I-type instruction
-    elif curr_inst[-7:] in op_code_i.values():
-        opcode = curr_inst[-7:]
-        funct3 = curr_inst[-15:-12]
-        rs1 = curr_inst[-20:-15]
-        rd = curr_inst[-12:-7]
-        imm = curr_inst[-32:-20]
-        imm_value = process_imm(imm)
-
-        # Performing the operation based on the opcode and funct3 values
-        if opcode == "0000011":
-            addr_val = registers[rs1] + imm_value
-            address = binary_to_hexa(bin(addr_val)[2:].zfill(32))
-            
-            if address in data_mem:
-                registers[rd] = data_mem[address]
-            elif address in stack_mem:
-                registers[rd] = stack_mem[address]
-            else:
-                print(f"Invalid memory address to load from: {address}")
+# Mask keeping register values within 32 bits
+MASK_32 = 0xFFFFFFFF
+
+# Value of the stack pointer when the simulation starts
+INITIAL_SP = 380
+
+# Layout of the stack and data memory regions
+STACK_BASE = 0x00000100
+STACK_SIZE = 128
+DATA_BASE = 0x00010000
+DATA_SIZE = 128
+
+# Number of data memory words written at the end of the trace
+DATA_DUMP_WORDS = 32
+
+# Default number of instructions executed before the run is stopped
+DEFAULT_MAX_STEPS = 100
+
+# Step budget given to translated blocks when the run has no step limit
+UNLIMITED_BUDGET = 1 << 62
+
+# Word of the virtual halt instruction (beq zero,zero,0)
+HALT_WORD = 0b00000000000000000000000001100011
+
+# Decoded form of an instruction word, built once when the program is loaded
+class Instruction:
+    __slots__ = ("opcode", "rd", "rs1", "rs2", "funct3", "funct7", "imm", "handler", "mnemonic")
+
+    def __init__(self, opcode, rd, rs1, rs2, funct3, funct7, imm, handler):
+        self.opcode = opcode
+        self.rd = rd
+        self.rs1 = rs1
+        self.rs2 = rs2
+        self.funct3 = funct3
+        self.funct7 = funct7
+        self.imm = imm
+        self.handler = handler
+        # Name of the instruction, taken from its handler exec_<mnemonic>
+        self.mnemonic = handler.__name__[5:]
+
+# Function to interpret an unsigned 32-bit register value as a signed integer
+def to_signed(value):
+    return value - ((value & 0x80000000) << 1)
+
+# Function to sign-extend the lowest bit_length bits of a value
+def sign_extend(value, bit_length):
+    sign_bit = 1 << (bit_length - 1)
+    return (value & (sign_bit - 1)) - (value & sign_bit)
+
+# Functions to extract the immediate of each instruction format from a word
+def imm_i(word):
+    return sign_extend(word >> 20, 12)
+
+def imm_s(word):
+    return sign_extend(((word >> 25) << 5) | ((word >> 7) & 0x1F), 12)
+
+def imm_b(word):
+    imm = (((word >> 31) & 0x1) << 12) | (((word >> 7) & 0x1) << 11) | (((word >> 25) & 0x3F) << 5) | (((word >> 8) & 0xF) << 1)
+    return sign_extend(imm, 13)
+
+def imm_j(word):
+    imm = (((word >> 31) & 0x1) << 20) | (((word >> 12) & 0xFF) << 12) | (((word >> 20) & 0x1) << 11) | (((word >> 21) & 0x3FF) << 1)
+    return sign_extend(imm, 21)
+
+def imm_u(word):
+    return sign_extend(word & 0xFFFFF000, 32)
+
+# Handlers executing a decoded instruction on a Simulator, each one returns the next PC
+# and memory accesses outside the mapped regions raise a MemoryFault
+def exec_halt(sim, inst, pc):
+    return None
+
+def exec_nop(sim, inst, pc):
+    return pc + 4
+
+# R-type instructions
+def exec_add(sim, inst, pc):
+    sim.registers[inst.rd] = (sim.registers[inst.rs1] + sim.registers[inst.rs2]) & MASK_32
+    return pc + 4
+
+def exec_sub(sim, inst, pc):
+    sim.registers[inst.rd] = (sim.registers[inst.rs1] - sim.registers[inst.rs2]) & MASK_32
+    return pc + 4
+
+def exec_sll(sim, inst, pc):
+    sim.registers[inst.rd] = (sim.registers[inst.rs1] << (sim.registers[inst.rs2] & 0x1F)) & MASK_32
+    return pc + 4
+
+def exec_slt(sim, inst, pc):
+    sim.registers[inst.rd] = 1 if to_signed(sim.registers[inst.rs1]) < to_signed(sim.registers[inst.rs2]) else 0
+    return pc + 4
+
+def exec_sltu(sim, inst, pc):
+    sim.registers[inst.rd] = 1 if sim.registers[inst.rs1] < sim.registers[inst.rs2] else 0
+    return pc + 4
+
+def exec_xor(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] ^ sim.registers[inst.rs2]
+    return pc + 4
+
+def exec_srl(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] >> (sim.registers[inst.rs2] & 0x1F)
+    return pc + 4
+
+def exec_sra(sim, inst, pc):
+    sim.registers[inst.rd] = (to_signed(sim.registers[inst.rs1]) >> (sim.registers[inst.rs2] & 0x1F)) & MASK_32
+    return pc + 4
+
+def exec_or(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] | sim.registers[inst.rs2]
+    return pc + 4
+
+def exec_and(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] & sim.registers[inst.rs2]
+    return pc + 4
+
+# Loads, with the bytes and halfwords sign- or zero-extended to 32 bits
+def exec_lb(sim, inst, pc):
+    sim.registers[inst.rd] = sign_extend(sim.memory.load_byte((sim.registers[inst.rs1] + inst.imm) & MASK_32), 8) & MASK_32
+    return pc + 4
+
+def exec_lh(sim, inst, pc):
+    sim.registers[inst.rd] = sign_extend(sim.memory.load_half((sim.registers[inst.rs1] + inst.imm) & MASK_32), 16) & MASK_32
+    return pc + 4
+
+def exec_lw(sim, inst, pc):
+    sim.registers[inst.rd] = sim.memory.load_word((sim.registers[inst.rs1] + inst.imm) & MASK_32)
+    return pc + 4
+
+def exec_lbu(sim, inst, pc):
+    sim.registers[inst.rd] = sim.memory.load_byte((sim.registers[inst.rs1] + inst.imm) & MASK_32)
+    return pc + 4
+
+def exec_lhu(sim, inst, pc):
+    sim.registers[inst.rd] = sim.memory.load_half((sim.registers[inst.rs1] + inst.imm) & MASK_32)
+    return pc + 4
+
+# I-type arithmetic, the shifts take their amount from the low 5 bits of the immediate
+def exec_addi(sim, inst, pc):
+    sim.registers[inst.rd] = (sim.registers[inst.rs1] + inst.imm) & MASK_32
+    return pc + 4
+
+def exec_slti(sim, inst, pc):
+    sim.registers[inst.rd] = 1 if to_signed(sim.registers[inst.rs1]) < inst.imm else 0
+    return pc + 4
+
+def exec_sltiu(sim, inst, pc):
+    sim.registers[inst.rd] = 1 if sim.registers[inst.rs1] < inst.imm & MASK_32 else 0
+    return pc + 4
+
+def exec_xori(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] ^ (inst.imm & MASK_32)
+    return pc + 4
+
+def exec_ori(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] | (inst.imm & MASK_32)
+    return pc + 4
+
+def exec_andi(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] & (inst.imm & MASK_32)
+    return pc + 4
+
+def exec_slli(sim, inst, pc):
+    sim.registers[inst.rd] = (sim.registers[inst.rs1] << (inst.imm & 0x1F)) & MASK_32
+    return pc + 4
+
+def exec_srli(sim, inst, pc):
+    sim.registers[inst.rd] = sim.registers[inst.rs1] >> (inst.imm & 0x1F)
+    return pc + 4
+
+def exec_srai(sim, inst, pc):
+    sim.registers[inst.rd] = (to_signed(sim.registers[inst.rs1]) >> (inst.imm & 0x1F)) & MASK_32
+    return pc + 4
+
+def exec_jalr(sim, inst, pc):
+    next_pc = (sim.registers[inst.rs1] + inst.imm) & MASK_32 & ~1
+    sim.registers[inst.rd] = (pc + 4) & MASK_32
+    return next_pc
+
+# Stores, keeping the low byte, halfword or word of rs2
+def exec_sb(sim, inst, pc):
+    sim.memory.store_byte((sim.registers[inst.rs1] + inst.imm) & MASK_32, sim.registers[inst.rs2])
+    return pc + 4
+
+def exec_sh(sim, inst, pc):
+    sim.memory.store_half((sim.registers[inst.rs1] + inst.imm) & MASK_32, sim.registers[inst.rs2])
+    return pc + 4
+
+def exec_sw(sim, inst, pc):
+    sim.memory.store_word((sim.registers[inst.rs1] + inst.imm) & MASK_32, sim.registers[inst.rs2])
+    return pc + 4
+
+# Branches, the signed ones compare the registers as two's complement values
+def exec_beq(sim, inst, pc):
+    if sim.registers[inst.rs1] == sim.registers[inst.rs2]:
+        return pc + inst.imm
+    return pc + 4
+
+def exec_bne(sim, inst, pc):
+    if sim.registers[inst.rs1] != sim.registers[inst.rs2]:
+        return pc + inst.imm
+    return pc + 4
+
+def exec_blt(sim, inst, pc):
+    if to_signed(sim.registers[inst.rs1]) < to_signed(sim.registers[inst.rs2]):
+        return pc + inst.imm
+    return pc + 4
+
+def exec_bge(sim, inst, pc):
+    if to_signed(sim.registers[inst.rs1]) >= to_signed(sim.registers[inst.rs2]):
+        return pc + inst.imm
+    return pc + 4
+
+def exec_bltu(sim, inst, pc):
+    if sim.registers[inst.rs1] < sim.registers[inst.rs2]:
+        return pc + inst.imm
+    return pc + 4
+
+def exec_bgeu(sim, inst, pc):
+    if sim.registers[inst.rs1] >= sim.registers[inst.rs2]:
+        return pc + inst.imm
+    return pc + 4
+
+# Upper immediates and jumps
+def exec_lui(sim, inst, pc):
+    sim.registers[inst.rd] = inst.imm & MASK_32
+    return pc + 4
+
+def exec_auipc(sim, inst, pc):
+    sim.registers[inst.rd] = (pc + inst.imm) & MASK_32
+    return pc + 4
+
+def exec_jal(sim, inst, pc):
+    sim.registers[inst.rd] = (pc + 4) & MASK_32
+    return pc + inst.imm
+
+# Handlers of every RV32I instruction keyed by (opcode, funct3, funct7). The formats that have
+# no funct7 use None for it, and the U and J formats, which have no funct3 either, use None for both.
+# There is no environment to call or debugger to break into, so ecall and ebreak stop the machine
+# like the halt instruction, and fence only moves to the next instruction.
+handlers = {
+    (0b0110011, 0b000, 0b0000000): exec_add,
+    (0b0110011, 0b000, 0b0100000): exec_sub,
+    (0b0110011, 0b001, 0b0000000): exec_sll,
+    (0b0110011, 0b010, 0b0000000): exec_slt,
+    (0b0110011, 0b011, 0b0000000): exec_sltu,
+    (0b0110011, 0b100, 0b0000000): exec_xor,
+    (0b0110011, 0b101, 0b0000000): exec_srl,
+    (0b0110011, 0b101, 0b0100000): exec_sra,
+    (0b0110011, 0b110, 0b0000000): exec_or,
+    (0b0110011, 0b111, 0b0000000): exec_and,
+    (0b0000011, 0b000, None): exec_lb,
+    (0b0000011, 0b001, None): exec_lh,
+    (0b0000011, 0b010, None): exec_lw,
+    (0b0000011, 0b100, None): exec_lbu,
+    (0b0000011, 0b101, None): exec_lhu,
+    (0b0010011, 0b000, None): exec_addi,
+    (0b0010011, 0b010, None): exec_slti,
+    (0b0010011, 0b011, None): exec_sltiu,
+    (0b0010011, 0b100, None): exec_xori,
+    (0b0010011, 0b110, None): exec_ori,
+    (0b0010011, 0b111, None): exec_andi,
+    (0b0010011, 0b001, 0b0000000): exec_slli,
+    (0b0010011, 0b101, 0b0000000): exec_srli,
+    (0b0010011, 0b101, 0b0100000): exec_srai,
+    (0b1100111, 0b000, None): exec_jalr,
+    (0b0100011, 0b000, None): exec_sb,
+    (0b0100011, 0b001, None): exec_sh,
+    (0b0100011, 0b010, None): exec_sw,
+    (0b1100011, 0b000, None): exec_beq,
+    (0b1100011, 0b001, None): exec_bne,
+    (0b1100011, 0b100, None): exec_blt,
+    (0b1100011, 0b101, None): exec_bge,
+    (0b1100011, 0b110, None): exec_bltu,
+    (0b1100011, 0b111, None): exec_bgeu,
+    (0b0110111, None, None): exec_lui,
+    (0b0010111, None, None): exec_auipc,
+    (0b1101111, None, None): exec_jal,
+    (0b0001111, 0b000, None): exec_nop,
+    (0b1110011, 0b000, 0b0000000): exec_halt,
+}
+
+# Function extracting the immediate of each opcode
+imm_decoders = {0b0000011: imm_i, 0b0010011: imm_i, 0b1100111: imm_i, 0b1110011: imm_i, 0b0100011: imm_s,
+                0b1100011: imm_b, 0b0110111: imm_u, 0b0010111: imm_u, 0b1101111: imm_j}
+
+# Function to decode an instruction word into an Instruction record,
+# words matching no handler decode to an instruction doing nothing
+def decode(word):
+    opcode = word & 0x7F
+    rd = (word >> 7) & 0x1F
+    funct3 = (word >> 12) & 0x7
+    rs1 = (word >> 15) & 0x1F
+    rs2 = (word >> 20) & 0x1F
+    funct7 = word >> 25
+
+    if word == HALT_WORD:
+        return Instruction(opcode, rd, rs1, rs2, funct3, funct7, 0, exec_halt)
+    handler = (handlers.get((opcode, funct3, funct7)) or handlers.get((opcode, funct3, None))
+               or handlers.get((opcode, None, None), exec_nop))
+    imm_decoder = imm_decoders.get(opcode)
+    return Instruction(opcode, rd, rs1, rs2, funct3, funct7, imm_decoder(word) if imm_decoder else 0, handler)
+
+# A RISC-V machine that runs a loaded program and reports every step to an optional trace sink.
+# A trace sink is any object with write_state(pc, registers) and write_memory(base, words) methods.
+# With translate=True hot basic blocks are compiled into Python functions (see translator.py),
+# and with writable_program=True stores into the program decode it again and drop stale blocks.
+# With paged_memory=True every address outside the program can be loaded and stored (see PagedMemory),
+# and with profile=True the runs are instrumented by self.profiler (see profiler.py).
+# microarch takes the PerformanceModel options of a cache and branch predictor model timing the runs
+# as self.perf_model (see microarch.py), None leaves it out.
+class Simulator:
+    def __init__(self, trace=None, data_size=DATA_SIZE, translate=False, writable_program=False, paged_memory=False,
+                 profile=False, microarch=None):
+        self._trace = trace
+        self.data_size = data_size
+        self.translate = translate
+        self.writable_program = writable_program
+        self.paged_memory = paged_memory
+        self.halt_inst = decode(HALT_WORD)
+        self.profiler = Profiler(self) if profile else None
+        self.perf_model = PerformanceModel(self, **microarch) if microarch is not None else None
+        self.reset()
+
+    # Function to bring the machine back to its initial state, unloading the program
+    def reset(self):
+        # Register file indexed by register number, x0 is hard-wired to zero
+        # and every value is kept as an unsigned 32-bit integer
+        self.registers = [0] * 32
+        self.registers[2] = INITIAL_SP
+        self.memory = PagedMemory() if self.paged_memory else Memory()
+        self.memory.add_region("stack", STACK_BASE, STACK_SIZE)
+        self.memory.add_region("data", DATA_BASE, self.data_size)
+        self.instr_mem = []
+        self.code_end = 0
+        self.program_hash = program_hash(b"")
+        self.translator = Translator(self)
+        self.pc = 0
+        self.steps = 0
+        self.halted = False
+        self.fault = None
+
+    # Function to load a program into its own read-only region of memory and decode it once
+    def load(self, words):
+        if self.instr_mem:
+            self.memory.remove_region("program")
+        program = self.memory.add_region("program", 0, 4 * len(words), writable=self.writable_program)
+        image = b"".join(WORD.pack(word) for word in words)
+        self.write_program(image)
+        self.program_hash = program_hash(image)
+        self.instr_mem = [decode(word) for word in words]
+        self.translator.invalidate()
+        if self.writable_program:
+            program.on_store = self.program_written
+            self.code_end = program.end
+
+    # Function to copy the program image to address 0. The regions mapped before the program (the stack
+    # and data) shadow it, as the flat memory finds them first, so in paged memory, where every region
+    # shares the same pages, the program bytes they overlap are not written.
+    def write_program(self, image):
+        if not self.paged_memory:
+            self.memory.write_bytes(0, image)
+            return
+        position = 0
+        shadows = sorted((region.base, region.end) for region in self.memory.regions if region.name != "program")
+        for base, end in shadows:
+            if base >= len(image):
                 break
-            PC += 4
-            
-        elif opcode == "0010011":
-            if funct3 == '000':
-                registers[rd] = registers[rs1] + imm_value
-            PC += 4
-            
-        elif opcode == "1100111" and funct3 == '000':
-            return_addr = PC + 4
-            PC = (registers[rs1] + imm_value) & ~1
-            registers[rd] = return_addr
-            
-        registers["00000"] = 0
-
-    # Check if the instruction is a S-type instruction
-    elif curr_inst[-7:] in op_code_s.values():
-        opcode = curr_inst[-7:]
-        funct3 = curr_inst[-15:-12]
-        rs2 = curr_inst[-25:-20]
-        rs1 = curr_inst[-20:-15]
-        imm = curr_inst[-32:-25] + curr_inst[-12:-7]
-        imm_value = process_imm(imm)
-
-        # Performing the store operation based on the opcode and the particular registers
-        if opcode == "0100011":
-            addr_val = registers[rs1] + imm_value
-            address = binary_to_hexa(bin(addr_val)[2:].zfill(32))
-            
-            if address in data_mem:
-                data_mem[address] = registers[rs2]
-            elif address in stack_mem:
-                stack_mem[address] = registers[rs2]
-            else:
-                print(f"Invalid memory address to store at: {address}")
+            if base > position:
+                self.memory.write_bytes(position, image[position:base])
+            position = max(position, end)
+        if position < len(image):
+            self.memory.write_bytes(position, image[position:])
+
+    # Function to copy a data image into memory at address before the run, whatever the permissions
+    # of the region holding it. In flat memory an image outside every region gets a region of its own,
+    # and one overlapping a region it does not fit in faults.
+    def load_data(self, address, data):
+        if not self.paged_memory:
+            end = address + len(data)
+            overlapping = [region for region in self.memory.regions if region.base < end and address < region.end]
+            if not any(region.base <= address and end <= region.end for region in overlapping):
+                if overlapping or address < 0 or end > ADDRESS_SPACE:
+                    raise MemoryFault(address, True)
+                self.memory.add_region(f"image 0x{address:08X}", address, len(data) + (-len(data) % 4))
+        self.memory.write_bytes(address, data)
+
+    # Function to decode again the instructions overwritten by a store into the program
+    def program_written(self, address):
+        for index in {address >> 2, (address + 3) >> 2}:
+            if index < len(self.instr_mem):
+                self.instr_mem[index] = decode(self.memory.load_word(4 * index))
+        self.translator.invalidate()
+
+    # Function to capture the state of the machine in a Checkpoint. Pages equal to the ones of
+    # a previous checkpoint share its bytes instead of being copied again.
+    def snapshot(self, previous=None):
+        old_pages = previous.pages if previous is not None else {}
+        pages = {}
+        for address, data in self.memory.page_buffers():
+            old = old_pages.get(address)
+            pages[address] = old if old is not None and old == data else bytes(data)
+        return Checkpoint(self.steps, self.pc, self.halted, list(self.registers), pages)
+
+    # Function to bring the machine back to a checkpoint taken with the same program loaded
+    def restore(self, checkpoint):
+        self.registers[:] = checkpoint.registers
+        self.pc = checkpoint.pc
+        self.steps = checkpoint.steps
+        self.halted = checkpoint.halted
+        self.fault = None
+        self.memory.load_pages(checkpoint.pages)
+        if self.writable_program:
+            self.instr_mem = [decode(self.memory.load_word(4 * i)) for i in range(len(self.instr_mem))]
+        self.translator.invalidate()
+
+    # Trace sink reporting every step, None to run untraced. Translated blocks are compiled for one
+    # of the two, so they are dropped when tracing is switched on or off.
+    @property
+    def trace(self):
+        return self._trace
+
+    @trace.setter
+    def trace(self, trace):
+        if (trace is None) != (self._trace is None):
+            self.translator.invalidate()
+        self._trace = trace
+
+    # Whether the machine stopped on the halt instruction, a fault or by leaving the program
+    @property
+    def stopped(self):
+        return self.halted or self.pc >= len(self.instr_mem) * 4
+
+    def read_register(self, index):
+        return self.registers[index]
+
+    def write_register(self, index, value):
+        if index:
+            self.registers[index] = value & MASK_32
+
+    def read_word(self, address):
+        return self.memory.load_word(address)
+
+    def write_word(self, address, value):
+        self.memory.store_word(address, value)
+
+    # Function to execute a single instruction, returning whether it was executed
+    def step(self):
+        return self.run(1) == 1
+
+    # Function to execute instructions until the machine stops or max_steps of them ran
+    # (None means no limit), returning the number of instructions executed
+    def run(self, max_steps=None):
+        if self.profiler is not None:
+            return self.profiler.run(max_steps)
+        if self.perf_model is not None:
+            return self.perf_model.run(max_steps)
+        if self.translate:
+            return self.run_translated(max_steps)
+        return self.interpret(max_steps)
+
+    # Function to run translated blocks, interpreting the instructions no block covers
+    # and the blocks longer than the remaining step budget
+    def run_translated(self, max_steps=None):
+        lookup = self.translator.lookup
+        registers = self.registers
+        memory = self.memory
+        write_state = self.trace.write_state if self.trace is not None else None
+        count = 0
+
+        while not self.halted and self.pc < len(self.instr_mem) * 4:
+            remaining = None if max_steps is None else max_steps - count
+            if remaining == 0:
+                break
+            block = lookup(self.pc)
+            if block is None or (remaining is not None and block.length > remaining):
+                count += self.interpret(1)
+                continue
+
+            budget = remaining if remaining is not None else UNLIMITED_BUDGET
+            self.pc, executed, fault = block.run(registers, memory, write_state, budget)
+            self.steps += executed
+            count += executed
+            if fault is not None:
+                self.fault = fault
+                self.halted = True
+
+        return count
+
+    # Function to execute instructions one by one through their handlers
+    def interpret(self, max_steps=None):
+        registers = self.registers
+        instr_mem = self.instr_mem
+        halt_inst = self.halt_inst
+        trace = self.trace
+        program_end = len(instr_mem) * 4
+        pc = self.pc
+        count = 0
+
+        while not self.halted and pc < program_end:
+            # If the count reaches the step limit, break the loop to prevent infinite execution
+            if max_steps is not None and count >= max_steps:
+                break
+            count += 1
+
+            # Fetching the decoded instruction, misaligned or negative addresses fetch the halt instruction
+            curr_inst = instr_mem[pc >> 2] if pc >= 0 and not pc & 3 else halt_inst
+
+            # If the instruction is the halt instruction, report the final state and stop
+            if curr_inst.handler is exec_halt:
+                registers[0] = 0
+                self.halted = True
+                if trace is not None:
+                    trace.write_state(pc, registers)
                 break
-                
-        PC += 4
-        registers["00000"] = 0  
-    # Check if the instruction is a B-type instruction
-    elif curr_inst[-7:] in op_code_b.values():
-        opcode = curr_inst[-7:]
-        funct3 = curr_inst[-15:-12]
-        rs1 = curr_inst[-20:-15]
-        rs2 = curr_inst[-25:-20]
-        
-        imm = curr_inst[-32] + curr_inst[-8] + curr_inst[-31:-25] + curr_inst[-12:-8] + '0'
-        imm_value = process_imm(imm)
-        
-        if opcode == "1100011":
-            if funct3 == '000':
-                if registers[rs1] == registers[rs2]:
-                    PC += imm_value
-                else:
-                    PC += 4
-            elif funct3 == '001':
-                if registers[rs1] != registers[rs2]:
-                    PC += imm_value
-                else:
-                    PC += 4
-        
-        if (opcode == "1100011" and funct3 == '000' and 
-            rs1 == "00000" and rs2 == "00000" and imm_value == 0):
+
+            try:
+                pc = curr_inst.handler(self, curr_inst, pc)
+            except MemoryFault as fault:
+                self.fault = fault
+                self.halted = True
+                break
+            registers[0] = 0
+
+            # Reporting the current state of registers to the trace sink
+            if trace is not None:
+                trace.write_state(pc, registers)
+
+        self.pc = pc
+        self.steps += count
+        return count
+
+    # Function to write the final registers (when steps were not traced) and data memory to a trace sink
+    def write_final_state(self, trace, include_registers=False):
+        if include_registers:
+            trace.write_state(self.pc, self.registers)
+        trace.write_memory(DATA_BASE, self.memory.dump_words(DATA_BASE, DATA_DUMP_WORDS))
+
+# Characters of the text machine code format, used to tell it apart from raw binary
+TEXT_CHARACTERS = b"01 \t\r\n"
+
+# Number of leading bytes checked when detecting the format of a machine code file
+DETECT_BYTES = 4096
+
+# Function to read a machine code file into a list of words, detecting its format: text lines of
+# 32 '0'/'1' characters, Intel HEX records, or raw little-endian words read through a memory map.
+# Empty text lines hold the halt instruction, as the fetch stage used to default to it, and the
+# binary formats get the halt word the final newline of a text file would have given them.
+def read_program(input_file):
+    with open(input_file, "rb") as f_in:
+        if os.fstat(f_in.fileno()).st_size == 0:
+            return [HALT_WORD]
+        with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            head = data[:DETECT_BYTES]
+            if head.startswith(b":"):
+                return read_intel_hex(data) + [HALT_WORD]
+            if not head.translate(None, TEXT_CHARACTERS):
+                # Splitting on every kind of line ending, as reading in text mode did
+                lines = data[:].decode().replace("\r\n", "\n").replace("\r", "\n").split("\n")
+                return [int(line, 2) if line.strip() else HALT_WORD for line in lines]
+            if len(data) % 4:
+                raise ValueError(f"{input_file} is neither text nor a whole number of binary words")
+            return list(struct.unpack(f"<{len(data) // 4}I", data)) + [HALT_WORD]
+
+# Function to read the words of an Intel HEX image starting at address 0, with the gaps between
+# data records filled with zeros
+def read_intel_hex(data):
+    image = bytearray()
+    upper = 0
+    for number, line in enumerate(data[:].decode().split(), 1):
+        record = bytes.fromhex(line[1:])
+        if not line.startswith(":") or len(record) < 5 or len(record) != record[0] + 5 or sum(record) & 0xFF:
+            raise ValueError(f"Invalid Intel HEX record at line {number}")
+        count, address, kind = record[0], (record[1] << 8) | record[2], record[3]
+        if kind == 0x00:
+            address += upper
+            if len(image) < address + count:
+                image.extend(bytes(address + count - len(image)))
+            image[address:address + count] = record[4:4 + count]
+        elif kind == 0x01:
+            break
+        elif kind == 0x02:
+            upper = int.from_bytes(record[4:6], "big") << 4
+        elif kind == 0x04:
+            upper = int.from_bytes(record[4:6], "big") << 16
+    image.extend(bytes(-len(image) % 4))
+    return list(struct.unpack(f"<{len(image) // 4}I", image))
+
+# Function to parse a data image option given as FILE or FILE@ADDRESS into a (path, address) pair,
+# the address defaulting to the start of the data memory
+def parse_data_image(text):
+    path, _, address = text.rpartition("@")
+    if path:
+        try:
+            return path, int(address, 0)
+        except ValueError:
             pass
-            
-        registers["00000"] = 0
-
-    # Check if the instruction is a J-type instruction
-    elif curr_inst[-7:] in op_code_j.values():
-        opcode = curr_inst[-7:]
-        rd = curr_inst[-12:-7]
-        
-        imm = curr_inst[-32] + curr_inst[-20:-12] + curr_inst[-21] + curr_inst[-31:-21] + '0'
-        imm_value = process_imm(imm)
-        
-        # Performing the jump operation based on the opcode
-        if opcode == "1101111":
-            return_addr = PC + 4
-            PC += imm_value
-            registers[rd] = return_addr
-            
-        registers["00000"] = 0
-    
+    return text, DATA_BASE
+
+# Function to compute the size of the data memory, grown beyond data_size to hold the data images
+# starting inside it (rounded up to whole words). Images further away get regions of their own when
+# they are loaded, so the data memory never grows by more than the size of the images.
+def data_memory_size(images, data_size=DATA_SIZE):
+    for path, address in sorted(images, key=lambda image: image[1]):
+        if DATA_BASE <= address <= DATA_BASE + data_size:
+            data_size = max(data_size, address + os.path.getsize(path) - DATA_BASE)
+    return data_size + (-data_size % 4)
+
+# Function to read the (input, output, readable trace) paths of a batch, from a manifest file holding one
+# "input output [readable]" line per program (relative to the manifest folder, # starts a comment), or from
+# every machine code file of a directory, traced to output_dir/name and output_dir/name_r.txt
+def read_batch(source, output_dir):
+    if os.path.isdir(source):
+        os.makedirs(output_dir, exist_ok=True)
+        names = sorted(name for name in os.listdir(source) if os.path.isfile(os.path.join(source, name)))
+        return [(os.path.join(source, name), os.path.join(output_dir, name),
+                 os.path.join(output_dir, os.path.splitext(name)[0] + "_r.txt")) for name in names]
+
+    folder = os.path.dirname(source)
+    jobs = []
+    with open(source, "r") as f_in:
+        for line in f_in:
+            fields = line.split("#")[0].split()
+            if not fields:
+                continue
+            if len(fields) not in (2, 3):
+                raise ValueError(f"{source}: expected 'input output [readable]', got {line.strip()!r}")
+            paths = [os.path.join(folder, field) for field in fields]
+            jobs.append((paths[0], paths[1], paths[2] if len(paths) == 3 else None))
+    return jobs
+
+# Function to simulate one machine code file on a machine, which is reset first so it can be reused,
+# and write its trace. Returns the fault that stopped the run, if any.
+def simulate_file(sim, args, input_file, output_file, trace_file):
+    # Reading the program first, so that an unreadable input leaves no empty trace behind
+    words = read_program(input_file)
+
+    # Opening the trace writer, a binary or delta trace holds everything the readable trace would
+    if args.trace_format == "binary":
+        writer = BinaryTraceWriter(output_file)
+    elif args.trace_format == "delta":
+        writer = DeltaTraceWriter(output_file, args.trace_compression, args.keyframe_interval)
+    else:
+        writer = TextTraceWriter(output_file, trace_file)
+
+    sim.trace = None if args.final_only else writer
+    sim.reset()
+    sim.load(words)
+    for path, address in args.data:
+        with open(path, "rb") as f_in:
+            sim.load_data(address, f_in.read())
+    if args.resume:
+        sim.restore(find_checkpoint(args.resume, args.resume_step, sim.program_hash))
+
+    # The step limit counts the steps before the checkpoint a run resumed from
+    max_steps = None if not args.max_steps else max(args.max_steps - sim.steps, 0)
+    if args.checkpoint:
+        run_checkpointed(sim, max_steps, args.checkpoint, args.checkpoint_interval)
+    else:
+        sim.run(max_steps)
+
+    # Writing the final state of data memory to the output file and trace file
+    sim.write_final_state(writer, include_registers=args.final_only)
+    writer.close()
+    return sim.fault
+
+# Machines of a batch worker process keyed by their options, built by its first job and reused by the others
+batch_machines = {}
+
+# Function to run one (args, input, output, readable trace) job of a batch in a worker process,
+# returning the fault message of the run and the error that kept it from completing, if any
+def run_batch_job(job):
+    args, input_file, output_file, trace_file = job
+    try:
+        key = (args.translate, args.memory)
+        if key not in batch_machines:
+            batch_machines[key] = Simulator(data_size=data_memory_size(args.data), translate=args.translate,
+                                            paged_memory=args.memory == "paged")
+        fault = simulate_file(batch_machines[key], args, input_file, output_file, trace_file)
+    except Exception as error:
+        # One unreadable program or unwritable trace must not lose the results of the rest of the batch
+        return None, f"{type(error).__name__}: {error}"
+    return str(fault) if fault else None, None
+
+# Function to simulate every program of a batch, on one reused machine or across worker processes,
+# exiting with an error listing the programs that could not be simulated once all the others ran
+def run_batch(args):
+    jobs = [(args, *paths) for paths in read_batch(args.input_file, args.output_file)]
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_batch_job, jobs, chunksize=max(1, len(jobs) // (4 * args.workers))))
     else:
-        PC += 4
-    
-    # Writing the current state of registers to the output file and trace file
-    reg_values = [PC]
-    for reg_key in sorted(registers.keys()):
-        reg_values.append(registers[reg_key])
-    form_val = form_reg(reg_values)
-    file_oi.write(" ".join(form_val) + "\n")
-    
-    reg_values = [PC]
-    for reg_key in sorted(registers.keys()):
-        reg_values.append(registers[reg_key])
-    file_trace.write(" ".join(str(val) for val in reg_values) + "\n")
-
-# Writing the final state of data and stack memory to the output file and trace file
-for addr in sorted(data_mem.keys()):
-    binary_val = convert_to_binary(data_mem[addr], 32)
-    file_oi.write(f'{addr}:0b{binary_val}\n')
-
-for addr in sorted(data_mem.keys()):
-    file_trace.write(f'{addr}:{data_mem[addr]}\n')
-
-# for addr in sorted(stack_mem.keys()):
-#     binary_val = convert_to_binary(stack_mem[addr], 32)
-#     file_oi.write(f'{addr}:0b{binary_val}\n')
-
-# for addr in sorted(stack_mem.keys()):
-#     file_trace.write(f'{addr}:{stack_mem[addr]}\n')
-
-# Closing the output and trace files
-file_oi.close()
-file_trace.close()
+        results = [run_batch_job(job) for job in jobs]
+    failed = []
+    for (_, input_file, _, _), (fault, error) in zip(jobs, results):
+        if fault:
+            print(f"{input_file}: {fault}")
+        if error:
+            print(f"{input_file}: failed, {error}")
+            failed.append(input_file)
+    if failed:
+        sys.exit(f"{len(failed)} of {len(jobs)} programs failed:\n" + "\n".join(failed))
+
+# Command line entry point: simulate input_file and write its trace
+def main(argv=None):
+    # Reading the input, output and readable trace file names from the command line
+    parser = argparse.ArgumentParser(description="Simulate a RISC-V machine code file and write its trace")
+    parser.add_argument("input_file", help="machine code file, text with one 32-bit binary word per line, "
+                                           "raw little-endian words or Intel HEX "
+                                           "(with --batch, a manifest file or a directory of machine code files)")
+    parser.add_argument("output_file", help="trace file compared by the graders "
+                                            "(with --batch, the output directory used for a directory of inputs)")
+    parser.add_argument("trace_file", nargs="?", default="trace.txt", help="readable trace file with decimal values")
+    parser.add_argument("--trace-format", choices=["text", "binary", "delta"], default="text",
+                        help="write output_file as text, as binary records or as compressed records of the values "
+                             "that changed (see trace_writer.py)")
+    parser.add_argument("--trace-compression", choices=sorted(COMPRESSIONS), default="gzip",
+                        help="with --trace-format delta, compression of the trace (default gzip)")
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL,
+                        help=f"with --trace-format delta, rows between two full rows (default {KEYFRAME_INTERVAL})")
+    parser.add_argument("--data", type=parse_data_image, action="append", default=[], metavar="FILE[@ADDRESS]",
+                        help=f"load the raw bytes of FILE into memory at ADDRESS (default 0x{DATA_BASE:08X}, the data "
+                             "image written by the assembler) before the run, growing the data memory to hold the images "
+                             "starting inside it and mapping the others on their own; can be repeated")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                        help=f"instructions executed before stopping, 0 runs until the halt instruction (default {DEFAULT_MAX_STEPS})")
+    parser.add_argument("--final-only", action="store_true",
+                        help="write only the final registers and memory instead of a row per step")
+    parser.add_argument("--translate", action="store_true",
+                        help="compile hot basic blocks into Python functions for faster long runs")
+    parser.add_argument("--memory", choices=["flat", "paged"], default="flat",
+                        help="flat maps only the stack and data words, paged makes the whole 32-bit space usable")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write an instruction, branch, memory and host time profile to FILE (CSV when it ends "
+                             "with .csv, JSON otherwise), profiled runs are never translated")
+    parser.add_argument("--perf", action="store_true",
+                        help="model the caches and the branch predictor, printing hit rates, mispredictions and the "
+                             "estimated CPI at exit, modelled runs are never translated")
+    parser.add_argument("--perf-report", metavar="FILE", help="with --perf, also write the full model report as JSON to FILE")
+    parser.add_argument("--icache", type=parse_cache, default=DEFAULT_ICACHE, metavar="SIZE,WAYS,LINE",
+                        help="with --perf, instruction cache geometry in bytes (default %s)" % ",".join(map(str, DEFAULT_ICACHE)))
+    parser.add_argument("--dcache", type=parse_cache, default=DEFAULT_DCACHE, metavar="SIZE,WAYS,LINE",
+                        help="with --perf, data cache geometry in bytes (default %s)" % ",".join(map(str, DEFAULT_DCACHE)))
+    parser.add_argument("--predictor", choices=["bimodal", "gshare"], default=DEFAULT_PREDICTOR,
+                        help=f"with --perf, branch predictor (default {DEFAULT_PREDICTOR})")
+    parser.add_argument("--predictor-entries", type=int, default=DEFAULT_PREDICTOR_ENTRIES,
+                        help=f"with --perf, 2-bit counters of the predictor, a power of two (default {DEFAULT_PREDICTOR_ENTRIES})")
+    parser.add_argument("--miss-penalty", type=int, default=DEFAULT_MISS_PENALTY,
+                        help=f"with --perf, cycles lost on a cache miss (default {DEFAULT_MISS_PENALTY})")
+    parser.add_argument("--mispredict-penalty", type=int, default=DEFAULT_MISPREDICT_PENALTY,
+                        help=f"with --perf, cycles lost on a mispredicted branch or a jalr (default {DEFAULT_MISPREDICT_PENALTY})")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="write checkpoints of the machine to FILE before the run and every --checkpoint-interval steps")
+    parser.add_argument("--checkpoint-interval", type=int, default=DEFAULT_INTERVAL,
+                        help=f"steps between two checkpoints (default {DEFAULT_INTERVAL})")
+    parser.add_argument("--resume", metavar="FILE",
+                        help="start from the last checkpoint of FILE taken with the same input_file, "
+                             "the trace then holds only the steps after it")
+    parser.add_argument("--resume-step", type=int,
+                        help="with --resume, start from the last checkpoint taken at or before this step")
+    parser.add_argument("--batch", action="store_true",
+                        help="simulate every program listed in the input_file manifest or found in the input_file "
+                             "directory in this process, reusing one machine")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="with --batch, number of worker processes sharing the programs (default 1)")
+    args = parser.parse_args(argv)
+
+    if args.keyframe_interval <= 0:
+        parser.error("--keyframe-interval must be positive")
+    if args.max_steps < 0:
+        parser.error("--max-steps cannot be negative")
+    if args.checkpoint_interval <= 0:
+        parser.error("--checkpoint-interval must be positive")
+    for path, _ in args.data:
+        if not os.path.isfile(path):
+            parser.error(f"data image {path} not found")
+
+    if args.batch:
+        if args.profile or args.perf or args.checkpoint or args.resume:
+            parser.error("--profile, --perf, --checkpoint and --resume apply to a single program, not to --batch")
+        run_batch(args)
+        return
+    if args.profile and args.perf:
+        parser.error("--profile and --perf cannot be combined")
+    if args.predictor_entries <= 0 or args.predictor_entries & (args.predictor_entries - 1):
+        parser.error("--predictor-entries must be a power of two")
+
+    microarch = None
+    if args.perf:
+        microarch = {"icache": args.icache, "dcache": args.dcache, "predictor": args.predictor,
+                     "predictor_entries": args.predictor_entries, "miss_penalty": args.miss_penalty,
+                     "mispredict_penalty": args.mispredict_penalty}
+    sim = Simulator(data_size=data_memory_size(args.data), translate=args.translate, paged_memory=args.memory == "paged",
+                    profile=args.profile is not None, microarch=microarch)
+    try:
+        fault = simulate_file(sim, args, args.input_file, args.output_file, args.trace_file)
+    except MemoryFault as error:
+        parser.error(f"a data image does not fit in memory, try --memory paged ({error})")
+    except ValueError as error:
+        if not args.resume:
+            raise
+        parser.error(f"cannot resume from {args.resume}: {error}")
+    if fault:
+        print(fault)
+    if sim.profiler is not None:
+        sim.profiler.write_report(args.profile)
+    if sim.perf_model is not None:
+        print(sim.perf_model.summary())
+        if args.perf_report:
+            sim.perf_model.write_report(args.perf_report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Writers producing the trace of a simulation, either as the text read by the graders
+# or as compact fixed-width binary records, or delta-encoded compressed records, that can be
+# converted back to text later
+import gzip
+import lzma
+import struct
+import sys
+
+# Header of a binary trace: magic, format version and a reserved field
+BINARY_HEADER = struct.Struct("<4sHH")
+BINARY_MAGIC = b"RVTR"
+BINARY_VERSION = 1
+
+# Every binary record is 34 little-endian words: a kind word followed by 33 values.
+# A state record holds the PC and the 32 registers, a memory record holds a base
+# address followed by up to 32 words, with the number of words in the kind word.
+RECORD = struct.Struct("<34I")
+RECORD_STATE = 0
+RECORD_MEMORY = 1
+
+# A delta trace starts with the binary header (magic "RVDT") and holds one record per row, each
+# starting with its kind byte: a keyframe is the PC and the 32 registers, a delta is the PC, a mask
+# of the registers that changed since the previous row and their new values, and a memory record is
+# a base address, a word count, a bitmap of the words that changed since they were last written
+# (or that are not zero) and their values. The stream is compressed with gzip or lzma.
+DELTA_MAGIC = b"RVDT"
+DELTA_VERSION = 1
+DELTA_KEYFRAME = 0
+DELTA_STATE = 1
+DELTA_MEMORY = 2
+KEYFRAME = struct.Struct("<33I")
+DELTA_HEADER = struct.Struct("<II")
+MEMORY_HEADER = struct.Struct("<IH")
+
+# Default number of state rows between two keyframes of a delta trace
+KEYFRAME_INTERVAL = 1024
+
+# Openers of the compressions of delta traces, and the leading bytes telling them apart when reading
+COMPRESSIONS = {"gzip": gzip.open, "lzma": lzma.open, "none": open}
+COMPRESSION_MAGICS = {b"\x1f\x8b": gzip.open, b"\xfd7zXZ\x00": lzma.open}
+
+# Number of rows kept in memory before they are written out
+BUFFER_ROWS = 1024
+
+# Number of bytes of delta records kept in memory before they are written out
+BUFFER_BYTES = 1 << 16
+
+# Number of cached value strings after which the caches are emptied
+CACHE_LIMIT = 1 << 16
+
+# Cache of the '0b' prefixed 32-bit binary strings, built the first time a value is seen
+class BinaryStrings(dict):
+    def __missing__(self, value):
+        string = "0b" + format(value & 0xFFFFFFFF, "032b")
+        self[value] = string
+        return string
+
+# Cache of the signed decimal strings of 32-bit values
+class SignedStrings(dict):
+    def __missing__(self, value):
+        string = str(value - ((value & 0x80000000) << 1))
+        self[value] = string
+        return string
+
+# Writer of the text trace (binary strings) and of the readable trace (signed decimals)
+class TextTraceWriter:
+    def __init__(self, trace_path, readable_path=None, buffer_rows=BUFFER_ROWS):
+        self.file_trace = open(trace_path, "w")
+        self.file_readable = open(readable_path, "w") if readable_path else None
+        self.buffer_rows = buffer_rows
+        self.binary_strings = BinaryStrings()
+        self.signed_strings = SignedStrings()
+        self.trace_rows = []
+        self.readable_rows = []
+
+    # Function to add the state of the machine after a step
+    def write_state(self, pc, registers):
+        binary = self.binary_strings
+        self.trace_rows.append(binary[pc] + " " + " ".join([binary[val] for val in registers]))
+        if self.file_readable:
+            signed = self.signed_strings
+            self.readable_rows.append(str(pc) + " " + " ".join([signed[val] for val in registers]))
+        if len(self.trace_rows) >= self.buffer_rows:
+            self.flush()
+
+    # Function to add the words of memory starting at base
+    def write_memory(self, base, words):
+        for i, value in enumerate(words):
+            self.trace_rows.append(f"0x{base + 4 * i:08X}:{self.binary_strings[value]}")
+            if self.file_readable:
+                self.readable_rows.append(f"0x{base + 4 * i:08X}:{self.signed_strings[value]}")
+        if len(self.trace_rows) >= self.buffer_rows:
+            self.flush()
+
+    # Function to write the buffered rows to the files
+    def flush(self):
+        if self.trace_rows:
+            self.file_trace.write("\n".join(self.trace_rows) + "\n")
+            self.trace_rows = []
+        if self.readable_rows:
+            self.file_readable.write("\n".join(self.readable_rows) + "\n")
+            self.readable_rows = []
+        if len(self.binary_strings) > CACHE_LIMIT:
+            self.binary_strings.clear()
+        if len(self.signed_strings) > CACHE_LIMIT:
+            self.signed_strings.clear()
+
+    def close(self):
+        self.flush()
+        self.file_trace.close()
+        if self.file_readable:
+            self.file_readable.close()
+
+# Writer of the binary trace made of fixed-width records
+class BinaryTraceWriter:
+    def __init__(self, trace_path, buffer_rows=BUFFER_ROWS):
+        self.file_trace = open(trace_path, "wb")
+        self.file_trace.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0))
+        self.buffer_rows = buffer_rows
+        self.records = []
+
+    def write_state(self, pc, registers):
+        self.records.append(RECORD.pack(RECORD_STATE, pc & 0xFFFFFFFF, *registers))
+        if len(self.records) >= self.buffer_rows:
+            self.flush()
+
+    def write_memory(self, base, words):
+        for start in range(0, len(words), 32):
+            chunk = words[start:start + 32]
+            padding = [0] * (32 - len(chunk))
+            self.records.append(RECORD.pack(RECORD_MEMORY | (len(chunk) << 8), base + 4 * start, *chunk, *padding))
+        if len(self.records) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self.records:
+            self.file_trace.write(b"".join(self.records))
+            self.records = []
+
+    def close(self):
+        self.flush()
+        self.file_trace.close()
+
+# Writer of the delta trace: only the registers and memory words that changed are recorded, with a full
+# keyframe every keyframe_interval state rows so that a reader never replays more than that many deltas
+# to rebuild the registers of a row
+class DeltaTraceWriter:
+    def __init__(self, trace_path, compression="gzip", keyframe_interval=KEYFRAME_INTERVAL):
+        self.file_trace = COMPRESSIONS[compression](trace_path, "wb")
+        self.file_trace.write(BINARY_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, 0))
+        self.keyframe_interval = keyframe_interval
+        self.rows = 0
+        self.registers = None
+        self.memory = {}
+        self.buffer = bytearray()
+
+    def write_state(self, pc, registers):
+        previous = self.registers
+        if previous is None or self.rows % self.keyframe_interval == 0:
+            self.buffer.append(DELTA_KEYFRAME)
+            self.buffer += KEYFRAME.pack(pc & 0xFFFFFFFF, *registers)
+        else:
+            mask = 0
+            changed = []
+            for index, value in enumerate(registers):
+                if value != previous[index]:
+                    mask |= 1 << index
+                    changed.append(value)
+            self.buffer.append(DELTA_STATE)
+            self.buffer += DELTA_HEADER.pack(pc & 0xFFFFFFFF, mask)
+            self.buffer += struct.pack(f"<{len(changed)}I", *changed)
+        self.registers = list(registers)
+        self.rows += 1
+        if len(self.buffer) >= BUFFER_BYTES:
+            self.flush()
+
+    def write_memory(self, base, words):
+        memory = self.memory
+        for start in range(0, len(words), 0xFFFF):
+            chunk = words[start:start + 0xFFFF]
+            address = base + 4 * start
+            bitmap = bytearray((len(chunk) + 7) // 8)
+            changed = []
+            for i, value in enumerate(chunk):
+                if memory.get(address + 4 * i, 0) != value:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+                    changed.append(value)
+                    memory[address + 4 * i] = value
+            self.buffer.append(DELTA_MEMORY)
+            self.buffer += MEMORY_HEADER.pack(address, len(chunk)) + bitmap
+            self.buffer += struct.pack(f"<{len(changed)}I", *changed)
+        if len(self.buffer) >= BUFFER_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file_trace.write(self.buffer)
+            self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.file_trace.close()
+
+# Trace sink keeping the states and memory words in lists, for callers driving a Simulator in-process
+class ListTraceWriter:
+    def __init__(self):
+        self.states = []
+        self.memory = []
+
+    def write_state(self, pc, registers):
+        self.states.append((pc, tuple(registers)))
+
+    def write_memory(self, base, words):
+        self.memory.append((base, list(words)))
+
+    def close(self):
+        pass
+
+# Function to read the records of a binary trace as (kind, values) pairs
+def read_binary_trace(binary_path):
+    with open(binary_path, "rb") as f_in:
+        magic, version, _ = BINARY_HEADER.unpack(f_in.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f"{binary_path} is not a binary trace")
+        data = f_in.read()
+    for record in RECORD.iter_unpack(data):
+        yield record[0], record[1:]
+
+# Function to open a delta trace through the decompressor its first bytes call for, or return None
+# when the file is not a delta trace
+def open_delta_trace(path):
+    with open(path, "rb") as f_in:
+        start = f_in.read(6)
+    opener = next((opener for magic, opener in COMPRESSION_MAGICS.items() if start.startswith(magic)), open)
+    f_in = opener(path, "rb")
+    try:
+        header = f_in.read(BINARY_HEADER.size)
+    except (OSError, EOFError, lzma.LZMAError):
+        header = b""
+    if len(header) == BINARY_HEADER.size:
+        magic, version, _ = BINARY_HEADER.unpack(header)
+        if magic == DELTA_MAGIC and version == DELTA_VERSION:
+            return f_in
+    f_in.close()
+    return None
+
+# Function to read exactly size bytes of a delta trace, raising EOFError when the stream ends before
+def read_exact(f_in, size):
+    data = f_in.read(size)
+    if len(data) != size:
+        raise EOFError("delta trace ended in the middle of a record")
+    return data
+
+# Function to read the rows of a delta trace as ("state", pc, registers) and ("memory", base, words) tuples,
+# with the complete registers and words rebuilt from the deltas. A truncated trace (a run stopped while
+# writing it) is read up to its last complete row.
+def read_delta_trace(delta_path):
+    f_in = open_delta_trace(delta_path)
+    if f_in is None:
+        raise ValueError(f"{delta_path} is not a delta trace")
+    registers = [0] * 32
+    memory = {}
+    with f_in:
+        try:
+            while True:
+                kind = f_in.read(1)
+                if not kind:
+                    break
+                if kind[0] == DELTA_KEYFRAME:
+                    values = KEYFRAME.unpack(read_exact(f_in, KEYFRAME.size))
+                    registers = list(values[1:])
+                    yield "state", values[0], tuple(registers)
+                elif kind[0] == DELTA_STATE:
+                    pc, mask = DELTA_HEADER.unpack(read_exact(f_in, DELTA_HEADER.size))
+                    indexes = [index for index in range(32) if mask >> index & 1]
+                    values = struct.unpack(f"<{len(indexes)}I", read_exact(f_in, 4 * len(indexes)))
+                    for index, value in zip(indexes, values):
+                        registers[index] = value
+                    yield "state", pc, tuple(registers)
+                elif kind[0] == DELTA_MEMORY:
+                    base, count = MEMORY_HEADER.unpack(read_exact(f_in, MEMORY_HEADER.size))
+                    bitmap = read_exact(f_in, (count + 7) // 8)
+                    changed = [i for i in range(count) if bitmap[i >> 3] >> (i & 7) & 1]
+                    values = struct.unpack(f"<{len(changed)}I", read_exact(f_in, 4 * len(changed)))
+                    for i, value in zip(changed, values):
+                        memory[base + 4 * i] = value
+                    yield "memory", base, [memory.get(base + 4 * i, 0) for i in range(count)]
+                else:
+                    raise ValueError(f"{delta_path}: unknown record kind {kind[0]}")
+        except (EOFError, lzma.LZMAError, gzip.BadGzipFile):
+            # gzip and lzma raise these when their stream is cut short or its end is damaged
+            return
+
+# Function to convert a binary or delta trace into the text trace and optionally the readable trace
+def binary_to_text(binary_path, trace_path, readable_path=None):
+    writer = TextTraceWriter(trace_path, readable_path)
+    delta = open_delta_trace(binary_path)
+    if delta is not None:
+        delta.close()
+        for kind, address, values in read_delta_trace(binary_path):
+            if kind == "state":
+                writer.write_state(address - ((address & 0x80000000) << 1), values)
+            else:
+                writer.write_memory(address, values)
+        writer.close()
+        return
+    for kind, values in read_binary_trace(binary_path):
+        if kind == RECORD_STATE:
+            pc = values[0] - ((values[0] & 0x80000000) << 1)
+            writer.write_state(pc, values[1:])
+        else:
+            writer.write_memory(values[0], values[1:1 + (kind >> 8)])
+    writer.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 trace_writer.py binary_or_delta_trace_file output_trace_file [readable_trace_file]")
+        sys.exit(1)
+    binary_to_text(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
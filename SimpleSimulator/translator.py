@@ -0,0 +1,234 @@
+# Translation of the decoded program into basic blocks compiled once into Python functions.
+# A block runs straight-line code with the registers held in local variables, and ends at a
+# branch or jump, before the halt instruction or after MAX_BLOCK_LENGTH instructions.
+from memory import MemoryFault
+
+# Longest block translated, in instructions
+MAX_BLOCK_LENGTH = 64
+
+# Number of times the interpreter reaches a PC before a block starting there is translated
+HOT_THRESHOLD = 2
+
+# Python expressions of the instructions writing rd, from rs1, rs2, the signed value of rs1,
+# the immediate as a signed value (imm), an unsigned value (uimm) or a shift amount, and the pc
+ALU_OPS = {
+    "add": "({rs1} + {rs2}) & 0xFFFFFFFF",
+    "sub": "({rs1} - {rs2}) & 0xFFFFFFFF",
+    "sll": "({rs1} << ({rs2} & 0x1F)) & 0xFFFFFFFF",
+    "slt": "1 if ({rs1} ^ 0x80000000) < ({rs2} ^ 0x80000000) else 0",
+    "sltu": "1 if {rs1} < {rs2} else 0",
+    "xor": "{rs1} ^ {rs2}",
+    "srl": "{rs1} >> ({rs2} & 0x1F)",
+    "sra": "({signed} >> ({rs2} & 0x1F)) & 0xFFFFFFFF",
+    "or": "{rs1} | {rs2}",
+    "and": "{rs1} & {rs2}",
+    "addi": "({rs1} + {imm}) & 0xFFFFFFFF",
+    "slti": "1 if {signed} < {imm} else 0",
+    "sltiu": "1 if {rs1} < {uimm} else 0",
+    "xori": "{rs1} ^ {uimm}",
+    "ori": "{rs1} | {uimm}",
+    "andi": "{rs1} & {uimm}",
+    "slli": "({rs1} << {shamt}) & 0xFFFFFFFF",
+    "srli": "{rs1} >> {shamt}",
+    "srai": "({signed} >> {shamt}) & 0xFFFFFFFF",
+    "lui": "{uimm}",
+    "auipc": "({pc} + {imm}) & 0xFFFFFFFF",
+}
+
+# Python expressions of the loads reading the address rs1 + imm, and the Memory method each one calls
+LOAD_OPS = {
+    "lb": ("((load_byte({address}) ^ 0x80) - 0x80) & 0xFFFFFFFF", "load_byte"),
+    "lh": ("((load_half({address}) ^ 0x8000) - 0x8000) & 0xFFFFFFFF", "load_half"),
+    "lw": ("load_word({address})", "load_word"),
+    "lbu": ("load_byte({address})", "load_byte"),
+    "lhu": ("load_half({address})", "load_half"),
+}
+
+# Memory methods called by the stores with the address rs1 + imm and the value of rs2
+STORE_OPS = {"sb": "store_byte", "sh": "store_half", "sw": "store_word"}
+
+# Conditions of the branches on rs1 and rs2
+BRANCH_OPS = {
+    "beq": "{rs1} == {rs2}",
+    "bne": "{rs1} != {rs2}",
+    "blt": "({rs1} ^ 0x80000000) < ({rs2} ^ 0x80000000)",
+    "bge": "({rs1} ^ 0x80000000) >= ({rs2} ^ 0x80000000)",
+    "bltu": "{rs1} < {rs2}",
+    "bgeu": "{rs1} >= {rs2}",
+}
+
+# Functions telling whether a branch is taken from the values of rs1 and rs2, built from BRANCH_OPS
+BRANCH_CONDITIONS = {name: eval("lambda a, b: " + condition.format(rs1="a", rs2="b"))
+                     for name, condition in BRANCH_OPS.items()}
+
+# Instructions doing nothing but moving to the next one
+NOP_OPS = {"nop"}
+
+# A translated block: the PC it starts at, its number of instructions and its compiled function
+# run(registers, memory, write_state, budget) -> (next_pc, executed, fault),
+# which executes at most budget instructions
+class Block:
+    __slots__ = ("start", "length", "run")
+
+    def __init__(self, start, length, run):
+        self.start = start
+        self.length = length
+        self.run = run
+
+# Cache of the blocks of one Simulator keyed by their start PC
+class Translator:
+    def __init__(self, sim):
+        self.sim = sim
+        self.blocks = {}
+        self.heat = {}
+
+    # Function to drop every translated block, after the program changed
+    def invalidate(self):
+        self.blocks.clear()
+        self.heat.clear()
+
+    # Function to get the block starting at pc, translating it once the PC is hot
+    # (None when the interpreter has to execute the instruction at pc)
+    def lookup(self, pc):
+        if pc in self.blocks:
+            return self.blocks[pc]
+        heat = self.heat.get(pc, 0) + 1
+        self.heat[pc] = heat
+        if heat < HOT_THRESHOLD:
+            return None
+        block = self.translate(pc)
+        self.blocks[pc] = block
+        return block
+
+    # Function to check whether an instruction can be translated
+    @staticmethod
+    def translatable(inst):
+        name = inst.mnemonic
+        return (name in ALU_OPS or name in LOAD_OPS or name in STORE_OPS or name in BRANCH_OPS
+                or name in NOP_OPS or name in ("jal", "jalr"))
+
+    # Function to collect the instructions of the block starting at pc and compile them
+    def translate(self, pc):
+        instr_mem = self.sim.instr_mem
+        if pc < 0 or pc & 3:
+            return None
+        insts = []
+        index = pc >> 2
+        while index < len(instr_mem) and len(insts) < MAX_BLOCK_LENGTH:
+            inst = instr_mem[index]
+            if not self.translatable(inst):
+                break
+            insts.append(inst)
+            index += 1
+            if inst.mnemonic in BRANCH_OPS or inst.mnemonic in ("jal", "jalr"):
+                break
+        if not insts:
+            return None
+        return Block(pc, len(insts), self.compile(pc, insts))
+
+    # Function to generate the source of a block and compile it into a function.
+    # A block whose last instruction jumps back to its start loops inside the function
+    # for as long as the step budget allows another full pass.
+    def compile(self, start, insts):
+        traced = self.sim.trace is not None
+        code_end = self.sim.code_end
+        length = len(insts)
+        read = lambda n: f"x{n}" if n else "0"
+
+        last = insts[-1]
+        loop = ((last.mnemonic in BRANCH_OPS or last.mnemonic == "jal")
+                and start + 4 * (length - 1) + last.imm == start)
+
+        # Registers kept in locals: all of them when every step is traced, otherwise the ones used
+        used = set()
+        written = set()
+        methods = set()
+        for inst in insts:
+            if inst.mnemonic in LOAD_OPS:
+                methods.add(LOAD_OPS[inst.mnemonic][1])
+            elif inst.mnemonic in STORE_OPS:
+                methods.add(STORE_OPS[inst.mnemonic])
+            used.update((inst.rs1, inst.rs2, inst.rd))
+            written.add(inst.rd)
+        used = set(range(1, 32)) if traced else used - {0}
+        written.discard(0)
+        state = "[0, " + ", ".join(f"x{n}" for n in range(1, 32)) + "]"
+        writeback = [f"R[{n}] = x{n}" for n in sorted(written)]
+        done = "n + " if loop else ""
+
+        # Lines closing the block at next_pc after count instructions of the current pass
+        def leave(pad, next_pc, count):
+            return [pad + line for line in writeback] + [f"{pad}return {next_pc}, {done}{count}, None"]
+
+        # Lines of a jump to target, which starts the next pass when it goes back to the start
+        def jump(pad, target, count):
+            lines = []
+            if traced:
+                lines.append(f"{pad}write_state({target}, {state})")
+            if loop and target == start:
+                lines.append(f"{pad}n += {length}")
+                lines.append(f"{pad}if n + {length} <= budget:")
+                lines.append(f"{pad}    continue")
+                return lines + leave(pad, start, 0)
+            return lines + leave(pad, target, count)
+
+        body = []
+        pad = "            " if loop else "        "
+        for k, inst in enumerate(insts):
+            pc = start + 4 * k
+            name = inst.mnemonic
+            rs1 = read(inst.rs1)
+            ops = {"rs1": rs1, "rs2": read(inst.rs2), "signed": f"(({rs1} ^ 0x80000000) - 0x80000000)",
+                   "imm": inst.imm, "uimm": inst.imm & 0xFFFFFFFF, "shamt": inst.imm & 0x1F, "pc": pc}
+            if name in ALU_OPS:
+                if inst.rd:
+                    body.append(f"{pad}x{inst.rd} = " + ALU_OPS[name].format(**ops))
+            elif name in LOAD_OPS:
+                body.append(f"{pad}k = {k}")
+                value = LOAD_OPS[name][0].format(address=f"({rs1} + {inst.imm}) & 0xFFFFFFFF")
+                body.append(f"{pad}x{inst.rd} = {value}" if inst.rd else pad + value)
+            elif name in STORE_OPS:
+                body.append(f"{pad}k = {k}")
+                body.append(f"{pad}a = ({ops['rs1']} + {inst.imm}) & 0xFFFFFFFF")
+                body.append(f"{pad}{STORE_OPS[name]}(a, {ops['rs2']})")
+                # A store into the program ends the block, its translation may now be stale
+                if code_end:
+                    body.append(f"{pad}if a < {code_end}:")
+                    if traced:
+                        body.append(f"{pad}    write_state({pc + 4}, {state})")
+                    body.extend(leave(pad + "    ", pc + 4, k + 1))
+            elif name in BRANCH_OPS:
+                body.append(f"{pad}if " + BRANCH_OPS[name].format(**ops) + ":")
+                body.extend(jump(pad + "    ", pc + inst.imm, k + 1))
+                body.extend(jump(pad, pc + 4, k + 1))
+                continue
+            elif name == "jal":
+                if inst.rd:
+                    body.append(f"{pad}x{inst.rd} = {(pc + 4) & 0xFFFFFFFF}")
+                body.extend(jump(pad, pc + inst.imm, k + 1))
+                continue
+            elif name == "jalr":
+                body.append(f"{pad}t = ({ops['rs1']} + {inst.imm}) & 0xFFFFFFFE")
+                if inst.rd:
+                    body.append(f"{pad}x{inst.rd} = {(pc + 4) & 0xFFFFFFFF}")
+                body.extend(jump(pad, "t", k + 1))
+                continue
+            if traced:
+                body.append(f"{pad}write_state({pc + 4}, {state})")
+            if k == length - 1:
+                body.extend(leave(pad, pc + 4, k + 1))
+
+        source = ["def block(R, memory, write_state, budget):"]
+        source += [f"    {method} = memory.{method}" for method in sorted(methods)]
+        source += [f"    x{n} = R[{n}]" for n in sorted(used)]
+        source += ["    k = 0", "    n = 0", "    try:"]
+        if loop:
+            source += ["        while True:"]
+        source += body
+        source += ["    except MemoryFault as fault:"]
+        source += ["        " + line for line in writeback]
+        source += [f"        return {start} + 4 * k, n + k + 1, fault"]
+
+        namespace = {"MemoryFault": MemoryFault}
+        exec(compile("\n".join(source), f"<block 0x{start:08X}>", "exec"), namespace)
+        return namespace["block"]
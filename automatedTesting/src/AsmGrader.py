@@ -19,8 +19,8 @@ class AsmGrader(Grader):
 	BIN_HARD_DIR = "bin_h"
 	BIN_SIMPLE_DIR = "bin_s"
 
-	def __init__(self, verb, enable,operating_system):
-		super().__init__(verb, enable,operating_system)
+	def __init__(self, verb, enable,operating_system, jobs=1, inProcess=False, cache=None):
+		super().__init__(verb, enable,operating_system, jobs, inProcess, cache)
 		self.enable = enable
 		self.operating_system == operating_system
 
@@ -72,54 +72,50 @@ class AsmGrader(Grader):
 		passCount = 0
 		totalCount = 0
 		
-		curDir = os.getcwd()
 		if self.operating_system == 'linux':
 			tests = self.listFiles("tests/assembly/" + genDir)
 		elif self.operating_system == 'windows':
 			tests = self.listFiles("tests\\assembly\\" + genDir)
 		tests.sort()
-		os.chdir(self.ASM_RUN_DIR)
-		
-		for test in tests:
-
-			python_command = 'python3 Assembler.py'
-			if self.operating_system == 'linux':
-				assembly_file = ' ' + '../automatedTesting/tests/assembly/' + genDir + '/' + test
-				machine_code_file = ' ' + '../automatedTesting/tests/assembly/user_' + expDir + '/' + test
-				machine_code_readable_file = ' ' + '../automatedTesting/tests/assembly/user_' + expDir + '/' + test.split(".")[0]+"_r.txt"
-				os.remove(machine_code_file) if os.path.exists(machine_code_file) else None; 
-				os.remove(machine_code_readable_file) if os.path.exists(machine_code_readable_file) else None;
-				#os.system('touch' + ' ' + machine_code_file)
-			elif self.operating_system == 'windows':
-				assembly_file = ' ' + '..\\automatedTesting\\tests\\assembly\\' + genDir + '\\' + test
-				machine_code_file = ' ' + '..\\automatedTesting\\tests\\assembly\\user_' + expDir + '\\' + test
-				machine_code_readable_file = ' ' + '..\\automatedTesting\\tests\\assembly\\user_' + expDir + '\\' + test.split(".")[0]+"_r.txt"
-				os.remove(machine_code_file) if os.path.exists(machine_code_file) else None; 
-				os.remove(machine_code_readable_file) if os.path.exists(machine_code_readable_file) else None;
-				#os.system('cd . >' + machine_code_file)
-			command = python_command + assembly_file + machine_code_file + machine_code_readable_file
-			os.system(command)
-			generatedBin = open(machine_code_file.strip(),'r').readlines()
 
+		# Paths are made absolute so that the tools can run from their own folder in any worker
+		tasks = []
+		outputFiles = []
+		expectedFiles = []
+		for test in tests:
 			if self.operating_system == 'linux':
-				exact_machine_code_file = "../automatedTesting/tests/assembly/" + expDir + "/" + test
+				assembly_file = 'tests/assembly/' + genDir + '/' + test
+				machine_code_file = 'tests/assembly/user_' + expDir + '/' + test
+				machine_code_readable_file = 'tests/assembly/user_' + expDir + '/' + test.split(".")[0]+"_r.txt"
+				exact_machine_code_file = "tests/assembly/" + expDir + "/" + test
 			elif self.operating_system == 'windows':
-				exact_machine_code_file = "..\\automatedTesting\\tests\\assembly\\" + expDir + "\\" + test
-			try:
-				expectedBin = open(exact_machine_code_file,'r').readlines()
-			except FileNotFoundError:
+				assembly_file = 'tests\\assembly\\' + genDir + '\\' + test
+				machine_code_file = 'tests\\assembly\\user_' + expDir + '\\' + test
+				machine_code_readable_file = 'tests\\assembly\\user_' + expDir + '\\' + test.split(".")[0]+"_r.txt"
+				exact_machine_code_file = "tests\\assembly\\" + expDir + "\\" + test
+			os.remove(machine_code_file) if os.path.exists(machine_code_file) else None;
+			os.remove(machine_code_readable_file) if os.path.exists(machine_code_readable_file) else None;
+			args = [os.path.abspath(assembly_file), os.path.abspath(machine_code_file), os.path.abspath(machine_code_readable_file)]
+			tasks.append((os.path.abspath(self.ASM_RUN_DIR), 'Assembler.py', args, self.inProcess))
+			outputFiles.append([machine_code_file, machine_code_readable_file])
+			expectedFiles.append(exact_machine_code_file)
+
+		results = self.runTasks(tasks, outputFiles, expectedFiles)
+
+		for test, (error, passed, cached), exact_machine_code_file in zip(tests, results, expectedFiles):
+			if error:
+				self.printSev(self.HIGH, bcolors.WARNING + error + bcolors.ENDC)
+			if not os.path.exists(exact_machine_code_file):
 				self.printSev(self.HIGH, bcolors.WARNING + "[Golden Binary Opcode File Not Found]\n" + exact_machine_code_file)
-				expectedBin = " "
-			
 
-			if self.diff(generatedBin, expectedBin):
-				self.printSev(self.HIGH, bcolors.OKGREEN + "[PASSED]" + bcolors.ENDC + " " + test)
+			suffix = " (cached)" if cached else ""
+			if passed:
+				self.printSev(self.HIGH, bcolors.OKGREEN + "[PASSED]" + bcolors.ENDC + " " + test + suffix)
 				passCount += 1
 			else:
-				self.printSev(self.HIGH, bcolors.FAIL + "[FAILED]" + bcolors.ENDC + " " + test)
+				self.printSev(self.HIGH, bcolors.FAIL + "[FAILED]" + bcolors.ENDC + " " + test + suffix)
 			totalCount += 1
 
-		os.chdir(curDir)
 		return passCount, totalCount
 	
 	
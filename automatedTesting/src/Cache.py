@@ -0,0 +1,114 @@
+# Persistent cache of test results, so that re-grading only runs the tools on the tests whose
+# tool sources, input or expected output changed since they were last graded
+
+import hashlib
+import json
+import os
+import shutil
+
+# Version of the cache layout, part of every key so that older caches are ignored. Caches of
+# version 1 may hold the verdicts of tools that crashed, which were taken for valid runs.
+CACHE_VERSION = 2
+
+class ResultCache:
+
+	INDEX_FILE = "index.json"
+
+	# Total size of the cached output files kept before the least recently used entries are evicted
+	MAX_BYTES = 256 << 20
+
+	def __init__(self, cacheDir, maxBytes=MAX_BYTES):
+		self.cacheDir = cacheDir
+		self.maxBytes = maxBytes
+		# Hash of the sources of each tool folder, computed once per run
+		self.toolHashes = {}
+		# Entries keyed by their hash, from the least to the most recently used
+		self.entries = {}
+		try:
+			with open(os.path.join(cacheDir, self.INDEX_FILE)) as f:
+				self.entries = json.load(f)
+		except (FileNotFoundError, ValueError):
+			pass
+
+	# Hashes every Python file of the folder the tool runs from, as the tool may import any of them
+	def toolHash(self, runDir):
+		if runDir not in self.toolHashes:
+			digest = hashlib.sha256()
+			for name in sorted(os.listdir(runDir)):
+				if name.endswith(".py"):
+					digest.update(name.encode() + b"\0")
+					with open(os.path.join(runDir, name), 'rb') as f:
+						digest.update(f.read())
+			self.toolHashes[runDir] = digest.hexdigest()
+		return self.toolHashes[runDir]
+
+	# Key of a test: the tool sources, the tool file, the input file and the expected file
+	def key(self, runDir, toolFile, inputFile, expectedFile):
+		digest = hashlib.sha256()
+		digest.update(str(CACHE_VERSION).encode() + b"\0" + self.toolHash(runDir).encode() + b"\0" + toolFile.encode() + b"\0")
+		for path in (inputFile, expectedFile):
+			try:
+				with open(path, 'rb') as f:
+					digest.update(b"file\0" + f.read())
+			except FileNotFoundError:
+				digest.update(b"missing\0")
+		return digest.hexdigest()
+
+	def blobPath(self, key, index):
+		return os.path.join(self.cacheDir, key + "." + str(index))
+
+	# Writes back the output files of a cached test and returns its verdict, or None when the test is not cached
+	def restore(self, key, outputFiles):
+		entry = self.entries.pop(key, None)
+		if entry is None:
+			return None
+		try:
+			for index, outputFile in enumerate(outputFiles):
+				if entry["outputs"][index]:
+					shutil.copyfile(self.blobPath(key, index), outputFile)
+				elif os.path.exists(outputFile):
+					os.remove(outputFile)
+		except (OSError, IndexError):
+			self.remove(key, entry)
+			return None
+		# Moving the entry to the most recently used end
+		self.entries[key] = entry
+		return entry["passed"]
+
+	# Stores the output files and the verdict of a test that was just run
+	def store(self, key, outputFiles, passed):
+		os.makedirs(self.cacheDir, exist_ok=True)
+		if key in self.entries:
+			self.remove(key, self.entries.pop(key))
+		outputs = []
+		size = 0
+		for index, outputFile in enumerate(outputFiles):
+			outputs.append(os.path.exists(outputFile))
+			if outputs[-1]:
+				shutil.copyfile(outputFile, self.blobPath(key, index))
+				size += os.path.getsize(outputFile)
+		self.entries[key] = {"passed": passed, "outputs": outputs, "size": size}
+		self.evict()
+
+	# Removes the least recently used entries until the cached files fit in maxBytes
+	def evict(self):
+		total = sum(entry["size"] for entry in self.entries.values())
+		for key in list(self.entries):
+			if total <= self.maxBytes:
+				break
+			entry = self.entries.pop(key)
+			total -= entry["size"]
+			self.remove(key, entry)
+
+	def remove(self, key, entry):
+		for index in range(len(entry["outputs"])):
+			if os.path.exists(self.blobPath(key, index)):
+				os.remove(self.blobPath(key, index))
+
+	# Writes the index of the cache, to be called once the grading is done
+	def save(self):
+		if not self.entries and not os.path.isdir(self.cacheDir):
+			return
+		os.makedirs(self.cacheDir, exist_ok=True)
+		with open(os.path.join(self.cacheDir, self.INDEX_FILE), 'w') as f:
+			json.dump(self.entries, f)
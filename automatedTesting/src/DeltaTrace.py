@@ -0,0 +1,119 @@
+# Reader of the delta traces written by the simulator with --trace-format delta, streaming their
+# rows without expanding them to disk. The format is described in SimpleSimulator/trace_writer.py;
+# it is decoded here again so that the grader does not depend on the simulator being graded.
+
+import gzip
+import lzma
+import struct
+import zlib
+
+HEADER = struct.Struct("<4sHH")
+MAGIC = b"RVDT"
+VERSION = 1
+
+KEYFRAME = 0
+STATE = 1
+MEMORY = 2
+
+KEYFRAME_VALUES = struct.Struct("<33I")
+STATE_HEADER = struct.Struct("<II")
+MEMORY_HEADER = struct.Struct("<IH")
+
+# Decompressors of the traces keyed by the leading bytes of their files
+OPENERS = {b"\x1f\x8b": gzip.open, b"\xfd7zXZ\x00": lzma.open}
+
+# Opens a delta trace through its decompressor, or returns None when the file is missing or is not a delta trace
+def openTrace(path):
+	try:
+		with open(path, 'rb') as f:
+			start = f.read(6)
+	except FileNotFoundError:
+		return None
+	opener = open
+	for magic, candidate in OPENERS.items():
+		if start.startswith(magic):
+			opener = candidate
+	f = opener(path, 'rb')
+	try:
+		header = f.read(HEADER.size)
+	except (OSError, EOFError, lzma.LZMAError, zlib.error):
+		header = b""
+	if len(header) == HEADER.size and HEADER.unpack(header)[:2] == (MAGIC, VERSION):
+		return f
+	f.close()
+	return None
+
+def isDeltaTrace(path):
+	f = openTrace(path)
+	if f is None:
+		return False
+	f.close()
+	return True
+
+# Reads exactly size bytes of a delta trace, raising EOFError when the stream ends before
+def readExact(f, size):
+	data = f.read(size)
+	if len(data) != size:
+		raise EOFError("delta trace ended in the middle of a record")
+	return data
+
+# Yields the rows of a delta trace as ("state", pc, registers) and ("memory", address, value) records,
+# one memory record per word like the lines of a text trace. A truncated trace is read up to its last
+# complete row, so that the rows it lost are reported as missing rather than failing the comparison,
+# and a corrupt trace ends with a ("corrupt", reason) record that no other trace holds.
+def readRecords(path):
+	f = openTrace(path)
+	if f is None:
+		return
+	registers = [0] * 32
+	memory = {}
+	with f:
+		try:
+			while True:
+				kind = f.read(1)
+				if not kind:
+					break
+				if kind[0] == KEYFRAME:
+					values = KEYFRAME_VALUES.unpack(readExact(f, KEYFRAME_VALUES.size))
+					registers = list(values[1:])
+					yield ("state", values[0], tuple(registers))
+				elif kind[0] == STATE:
+					pc, mask = STATE_HEADER.unpack(readExact(f, STATE_HEADER.size))
+					indexes = [i for i in range(32) if mask >> i & 1]
+					values = struct.unpack("<" + str(len(indexes)) + "I", readExact(f, 4 * len(indexes)))
+					for i, value in zip(indexes, values):
+						registers[i] = value
+					yield ("state", pc, tuple(registers))
+				elif kind[0] == MEMORY:
+					base, count = MEMORY_HEADER.unpack(readExact(f, MEMORY_HEADER.size))
+					bitmap = readExact(f, (count + 7) // 8)
+					changed = [i for i in range(count) if bitmap[i >> 3] >> (i & 7) & 1]
+					values = struct.unpack("<" + str(len(changed)) + "I", readExact(f, 4 * len(changed)))
+					for i, value in zip(changed, values):
+						memory[base + 4 * i] = value
+					for i in range(count):
+						yield ("memory", base + 4 * i, memory.get(base + 4 * i, 0))
+				else:
+					raise ValueError(path + ": unknown delta trace record " + str(kind[0]))
+		except (EOFError, lzma.LZMAError, gzip.BadGzipFile):
+			return
+		except (ValueError, zlib.error) as error:
+			yield ("corrupt", str(error))
+
+def binary(value):
+	return "0b" + format(value & 0xFFFFFFFF, "032b")
+
+# Formats a record as the line of the text trace holding it
+def recordLine(record):
+	if record is None:
+		return ""
+	if record[0] == "corrupt":
+		return "corrupt"
+	if record[0] == "state":
+		return binary(record[1]) + " " + " ".join(binary(value) for value in record[2])
+	return "0x" + format(record[1], "08X") + ":" + binary(record[2])
+
+# Yields the text trace lines of a delta trace
+def readLines(path):
+	for record in readRecords(path):
+		yield recordLine(record)
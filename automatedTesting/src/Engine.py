@@ -0,0 +1,53 @@
+# Grading engine running the tools under test, one after the other or across worker processes
+
+import importlib.util
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Tool modules already imported by this process for in-process runs, keyed by their path
+loadedTools = {}
+
+def loadTool(toolPath):
+	if toolPath not in loadedTools:
+		runDir = os.path.dirname(toolPath)
+		# The tools import their sibling modules, so their folder has to be importable
+		if runDir not in sys.path:
+			sys.path.insert(0, runDir)
+		moduleName = os.path.splitext(os.path.basename(toolPath))[0]
+		spec = importlib.util.spec_from_file_location(moduleName, toolPath)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		loadedTools[toolPath] = module
+	return loadedTools[toolPath]
+
+# Runs one tool on one test. In-process runs call the main(argv) function of the tool instead of
+# starting a new interpreter, which only works for tools that do nothing when imported.
+# Returns None on success, or an error message when the tool raised, exited with a non-zero status
+# or could not be started.
+def runTool(runDir, toolFile, args, inProcess):
+	if inProcess:
+		try:
+			loadTool(os.path.join(runDir, toolFile)).main(args)
+		except SystemExit as e:
+			if e.code is not None and e.code != 0:
+				return toolFile + ": exited with " + str(e.code)
+		except Exception as e:
+			return toolFile + ": " + repr(e)
+		return None
+
+	try:
+		rc = subprocess.run([sys.executable, toolFile] + args, cwd=runDir).returncode
+	except OSError as e:
+		return toolFile + ": " + repr(e)
+	if rc != 0:
+		return toolFile + ": exited with " + str(rc)
+	return None
+
+# Runs every (runDir, toolFile, args, inProcess) task and returns their results in the order of the tasks
+def runAll(tasks, jobs):
+	if jobs > 1 and len(tasks) > 1:
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			return list(executor.map(runTool, *zip(*tasks)))
+	return [runTool(*task) for task in tasks]
@@ -1,18 +1,32 @@
 # Parent class for all graders
+import mmap
+import os
+from itertools import zip_longest
 from os import listdir
 from os.path import isfile, join
 from colors import bcolors
+import DeltaTrace
+import Engine
 
 class Grader:
 	## ---- either 'linux' or 'windows'
 	operating_system = 'linux'
 	verbose = False
 	enable = False
+	## ---- number of worker processes running the tests
+	jobs = 1
+	## ---- run the tools through their main(argv) function instead of a new interpreter
+	inProcess = False
+	## ---- ResultCache shared by the graders, None when disabled
+	cache = None
 	
 	# Printing severity
 	HIGH = 1 	# Printed even if not verbose
 	LOW = 0
 
+	# Files of at least this many bytes are compared through a memory map
+	MMAP_THRESHOLD = 1 << 20
+
 	def printSev(self, sev, string, end = "\n"):
 		if sev == self.HIGH or self.verbose:
 			print(string, end=end)
@@ -21,37 +35,128 @@ class Grader:
 		return [f for f in listdir(dirPath) if isfile(join(dirPath, f))]
 
 
-	def diff(self, lines1, lines2):
-		lines1Clean = []
-		lines2Clean = []
+	# Yields the lines of a file one by one, through a memory map for large files,
+	# and nothing when the file does not exist
+	def readLines(self, path):
+		try:
+			f = open(path, 'rb')
+		except FileNotFoundError:
+			return
+		with f:
+			if os.fstat(f.fileno()).st_size >= self.MMAP_THRESHOLD:
+				with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+					for line in iter(mm.readline, b""):
+						yield line.decode(errors="replace")
+			else:
+				for line in f:
+					yield line.decode(errors="replace")
 
-		for l in lines1:
-			if l.strip() != "":
-				lines1Clean.append(l.strip())
+	# Yields the stripped non-empty lines
+	def cleanLines(self, lines):
+		for l in lines:
+			l = l.strip()
+			if l != "":
+				yield l
 
-		for l in lines2:
-			if l.strip() != "":
-				lines2Clean.append(l.strip())
+	# Describes where two differing lines diverge: the memory address of a memory line,
+	# the step and register (or PC) of a trace row, or the whole line otherwise
+	def describeMismatch(self, lineNum, generated, expected):
+		generatedFields = generated.split()
+		expectedFields = expected.split()
+		if ":" in generated or ":" in expected:
+			address = (expected or generated).split(":")[0]
+			where = "memory " + address
+		elif len(generatedFields) > 1 or len(expectedFields) > 1:
+			field = 0
+			for field, fields in enumerate(zip_longest(generatedFields, expectedFields, fillvalue="")):
+				if fields[0] != fields[1]:
+					break
+			generated = generatedFields[field] if field < len(generatedFields) else ""
+			expected = expectedFields[field] if field < len(expectedFields) else ""
+			where = "step " + str(lineNum) + ", " + ("PC" if field == 0 else "x" + str(field - 1))
+		else:
+			where = "line"
+		return "Mismatch at line " + str(lineNum) + " (" + where + "): expected " + (expected or "nothing") + ", got " + (generated or "nothing") + "."
 
+	# Compares two iterables of lines (lists, files or readLines generators) while ignoring blank lines
+	# and surrounding whitespace. The lines are streamed, and unless verbose the comparison stops at the
+	# first mismatch.
+	def diff(self, lines1, lines2):
 		match = True
 
-		# Match Size
-		if(len(lines1Clean) > len(lines2Clean)):
-			lines2Clean += [""] * (len(lines1Clean) - len(lines2Clean))
-		elif(len(lines2Clean) > len(lines1Clean)):
-			lines1Clean += [""] * (len(lines2Clean) - len(lines1Clean))
-
-		for lineNum, lines in enumerate(zip(lines1Clean, lines2Clean), 1):
+		for lineNum, lines in enumerate(zip_longest(self.cleanLines(lines1), self.cleanLines(lines2), fillvalue=""), 1):
 			if(lines[0] != lines[1]):
-				self.printSev(self.LOW, bcolors.FAIL + "Mismatch at line " + str(lineNum) +  "." + bcolors.ENDC)
-				match &= False
+				self.printSev(self.LOW, bcolors.FAIL + self.describeMismatch(lineNum, lines[0], lines[1]) + bcolors.ENDC)
+				match = False
+				if not self.verbose:
+					break
+
+		return match
+
+	# Compares two delta trace record streams like diff compares lines, formatting only the
+	# mismatching records as text lines to describe them
+	def diffRecords(self, records1, records2):
+		match = True
+
+		for lineNum, records in enumerate(zip_longest(records1, records2), 1):
+			if(records[0] != records[1]):
+				generated = DeltaTrace.recordLine(records[0])
+				expected = DeltaTrace.recordLine(records[1])
+				self.printSev(self.LOW, bcolors.FAIL + self.describeMismatch(lineNum, generated, expected) + bcolors.ENDC)
+				match = False
+				if not self.verbose:
+					break
 
 		return match
 
-	def __init__(self, verb, enable,operating_system):
+	# Compares two files line by line, see diff. Either file may be a delta trace, which is decoded
+	# while it is read, and two delta traces are compared record by record.
+	def diffFiles(self, path1, path2):
+		delta1 = DeltaTrace.isDeltaTrace(path1)
+		delta2 = DeltaTrace.isDeltaTrace(path2)
+		if delta1 and delta2:
+			return self.diffRecords(DeltaTrace.readRecords(path1), DeltaTrace.readRecords(path2))
+		lines1 = DeltaTrace.readLines(path1) if delta1 else self.readLines(path1)
+		lines2 = DeltaTrace.readLines(path2) if delta2 else self.readLines(path2)
+		return self.diff(lines1, lines2)
+
+	# Runs every (runDir, toolFile, args, inProcess) task whose result is not cached and compares the
+	# first of its output files with its expected file, the first argument of a task being its input.
+	# Returns an (error, passed, cached) triple for every task.
+	def runTasks(self, tasks, outputFiles, expectedFiles):
+		results = [None] * len(tasks)
+		keys = [None] * len(tasks)
+		pending = []
+		for i, (runDir, toolFile, args, inProcess) in enumerate(tasks):
+			if self.cache is not None:
+				keys[i] = self.cache.key(runDir, toolFile, args[0], expectedFiles[i])
+				passed = self.cache.restore(keys[i], outputFiles[i])
+				if passed is not None:
+					results[i] = (None, passed, True)
+					continue
+			pending.append(i)
+
+		errors = Engine.runAll([tasks[i] for i in pending], self.jobs)
+
+		for i, error in zip(pending, errors):
+			passed = self.diffFiles(outputFiles[i][0], expectedFiles[i])
+			results[i] = (error, passed, False)
+			# Results of tools that raised, exited with an error or could not be started are not kept,
+			# the failure may not come from the submission
+			if self.cache is not None and not error:
+				self.cache.store(keys[i], outputFiles[i], passed)
+
+		if self.cache is not None:
+			self.cache.save()
+		return results
+
+	def __init__(self, verb, enable,operating_system, jobs=1, inProcess=False, cache=None):
 		self.verbose = verb
 		self.enable = enable
 		self.operating_system = operating_system
+		self.jobs = jobs
+		self.inProcess = inProcess
+		self.cache = cache
 	
 	def grade(self):
 		raise NotImplementedError("Please Implement this method")
\ No newline at end of file
@@ -19,8 +19,8 @@ class SimGrader(Grader):
 	TRACE_SIMPLE_DIR = "simple"
 
 
-	def __init__(self, verb, enable,operating_system):
-		super().__init__(verb, enable,operating_system)
+	def __init__(self, verb, enable,operating_system, jobs=1, inProcess=False, cache=None):
+		super().__init__(verb, enable,operating_system, jobs, inProcess, cache)
 		self.enable = enable
 		self.operating_system = operating_system
 		
@@ -34,55 +34,50 @@ class SimGrader(Grader):
 		passCount = 0
 		totalCount = 0
 		
-		curDir = os.getcwd()
 		if self.operating_system == 'linux':
 			tests = self.listFiles("tests/bin/" + genDir)
 		elif self.operating_system == 'windows':
 			tests = self.listFiles("tests\\bin\\" + genDir)
 		tests.sort()
-		os.chdir(self.SIM_RUN_DIR)
-		
+
+		# Paths are made absolute so that the tools can run from their own folder in any worker
+		tasks = []
+		outputFiles = []
+		expectedFiles = []
 		for test in tests:
-			
-			python_command = 'python3 Simulator.py'
 			if self.operating_system == 'linux':
-				machine_code_file = ' ' + '../automatedTesting/tests/bin/' + genDir + '/' + test
-				output_trace_file = ' ' + '../automatedTesting/tests/user_traces/' + genDir + '/' + test
-				output_read_trace_file = ' ' + '../automatedTesting/tests/user_traces/' + genDir + '/' + test.split(".")[0]+"_r.txt"
-				os.remove(output_trace_file) if os.path.exists(output_trace_file) else None; 
-				os.remove(output_read_trace_file) if os.path.exists(output_read_trace_file) else None;
+				machine_code_file = 'tests/bin/' + genDir + '/' + test
+				output_trace_file = 'tests/user_traces/' + genDir + '/' + test
+				output_read_trace_file = 'tests/user_traces/' + genDir + '/' + test.split(".")[0]+"_r.txt"
+				exact_trace_file = "tests/traces/" + expDir + "/" + test
 			elif self.operating_system == 'windows':
-				machine_code_file = ' ' + '..\\automatedTesting\\tests\\bin\\' + genDir + '\\' + test
-				output_trace_file = ' ' + '..\\automatedTesting\\tests\\user_traces\\' + genDir + '\\' + test
-				output_read_trace_file = ' ' + '../automatedTesting/tests/user_traces/' + genDir + '/' + test.split(".")[0]+"_r.txt"
-				os.remove(output_trace_file) if os.path.exists(output_trace_file) else None; 
-				os.remove(output_read_trace_file) if os.path.exists(output_read_trace_file) else None;
-			command = python_command + machine_code_file + output_trace_file + output_read_trace_file
-			os.system(command)
-			
-			
-			generatedTrace = open(output_trace_file.strip(),'r').readlines()
+				machine_code_file = 'tests\\bin\\' + genDir + '\\' + test
+				output_trace_file = 'tests\\user_traces\\' + genDir + '\\' + test
+				output_read_trace_file = 'tests\\user_traces\\' + genDir + '\\' + test.split(".")[0]+"_r.txt"
+				exact_trace_file = "tests\\traces\\" + expDir + "\\" + test
+			os.remove(output_trace_file) if os.path.exists(output_trace_file) else None;
+			os.remove(output_read_trace_file) if os.path.exists(output_read_trace_file) else None;
+			args = [os.path.abspath(machine_code_file), os.path.abspath(output_trace_file), os.path.abspath(output_read_trace_file)]
+			tasks.append((os.path.abspath(self.SIM_RUN_DIR), 'Simulator.py', args, self.inProcess))
+			outputFiles.append([output_trace_file, output_read_trace_file])
+			expectedFiles.append(exact_trace_file)
 
-			if self.operating_system == 'linux':
-				exact_trace_file = "../automatedTesting/tests/traces/" + expDir + "/" + test
-			elif self.operating_system == 'windows':
-				exact_trace_file = "..\\automatedTesting\\tests\\traces\\" + expDir + "\\" + test
-				
-			try:
-				expectedTrace = open(exact_trace_file,'r').readlines()
-			except FileNotFoundError:
+		results = self.runTasks(tasks, outputFiles, expectedFiles)
+
+		for test, (error, passed, cached), exact_trace_file in zip(tests, results, expectedFiles):
+			if error:
+				self.printSev(self.HIGH, bcolors.WARNING + error + bcolors.ENDC)
+			if not os.path.exists(exact_trace_file):
 				self.printSev(self.HIGH, bcolors.WARNING + "[Golden Binary Trace File Not Found]\n" + exact_trace_file)
-				expectedTrace = " "
-			
 
-			if self.diff(generatedTrace, expectedTrace):
-				self.printSev(self.HIGH, bcolors.OKGREEN + "[PASSED]" + bcolors.ENDC + " " + test)
+			suffix = " (cached)" if cached else ""
+			if passed:
+				self.printSev(self.HIGH, bcolors.OKGREEN + "[PASSED]" + bcolors.ENDC + " " + test + suffix)
 				passCount += 1
 			else:
-				self.printSev(self.HIGH, bcolors.FAIL + "[FAILED]" + bcolors.ENDC + " " + test)
+				self.printSev(self.HIGH, bcolors.FAIL + "[FAILED]" + bcolors.ENDC + " " + test + suffix)
 			totalCount += 1
 
-		os.chdir(curDir)
 		return passCount, totalCount
 	
 	def grade(self):
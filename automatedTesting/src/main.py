@@ -5,11 +5,16 @@ from colors import bcolors
 from AsmGrader import AsmGrader
 from SimGrader import SimGrader
 from Results import Results
+from Cache import ResultCache
 
 
 VERBOSE = False
 GRADE_ASSEMBLER = True
 GRADE_SIMULATOR = True
+JOBS = 1
+IN_PROCESS = False
+USE_CACHE = True
+CACHE_DIR = ".cache"
 
 def printHelp():
 	print('----Please enter in correct format----')
@@ -18,7 +23,11 @@ def printHelp():
 	print("--no-sim to not grade simulator")
 	print("--linux for Linux operating system")
 	print("--windows for windows operating system")
+	print("--jobs N to run N tests at the same time")
+	print("--in-process to run the tools through their main(argv) function instead of a new python3 process")
+	print("--no-cache to run every test again instead of reusing the results of unchanged tests")
 	print("Example_linux: $python3 src/main.py --linux --no-sim")
+	print("Example_parallel: $python3 src/main.py --linux --jobs 8")
 	print("Example_windows: >python3 src\main.py --windows --no-sim")
 
 def setupArgs():
@@ -26,12 +35,16 @@ def setupArgs():
 	global GRADE_ASSEMBLER
 	global GRADE_SIMULATOR
 	global OPERATING_SYSTEM
+	global JOBS
+	global IN_PROCESS
+	global USE_CACHE
 
 	if len(sys.argv) < 3:
 		printHelp()
 		exit()
 
-	for arg in sys.argv[1:]:
+	args = iter(sys.argv[1:])
+	for arg in args:
 		if arg == "--verbose":
 			VERBOSE = True
 		elif arg == "--no-asm":
@@ -40,6 +53,16 @@ def setupArgs():
 			GRADE_SIMULATOR = False
 		elif ((arg == "--linux") | (arg == "--windows")):
 			OPERATING_SYSTEM = arg[2:]
+		elif arg == "--jobs":
+			jobs = next(args, "")
+			if not jobs.isdigit() or int(jobs) < 1:
+				printHelp()
+				exit()
+			JOBS = int(jobs)
+		elif arg == "--in-process":
+			IN_PROCESS = True
+		elif arg == "--no-cache":
+			USE_CACHE = False
 		else:
 			printHelp()
 			exit()
@@ -48,8 +71,11 @@ def setupArgs():
 def main():
 	setupArgs()
 
-	asmGrader = AsmGrader(VERBOSE, GRADE_ASSEMBLER,OPERATING_SYSTEM)
-	simGrader = SimGrader(VERBOSE, GRADE_SIMULATOR,OPERATING_SYSTEM)
+	# The graders share one cache, stored in the automatedTesting folder they run from
+	cache = ResultCache(CACHE_DIR) if USE_CACHE else None
+
+	asmGrader = AsmGrader(VERBOSE, GRADE_ASSEMBLER,OPERATING_SYSTEM, JOBS, IN_PROCESS, cache)
+	simGrader = SimGrader(VERBOSE, GRADE_SIMULATOR,OPERATING_SYSTEM, JOBS, IN_PROCESS, cache)
 
 	asmRes = asmGrader.grade()
 	simRes = simGrader.grade()	
@@ -0,0 +1,222 @@
+# Benchmarks of the assembler (lines/s) and the simulator (instructions/s), run in-process on
+# generated sources and programs with warmup and repetition. Results are written as JSON and can
+# be compared with a baseline, flagging every benchmark slower than the baseline by a threshold.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# The tools import their sibling modules, so their folders have to be importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SimpleAssembler"))
+sys.path.insert(0, os.path.join(ROOT, "SimpleSimulator"))
+
+from assembler import Assembler
+from simulator import Simulator
+from trace_writer import TextTraceWriter
+
+# Version of the results file format
+RESULTS_VERSION = 1
+
+# Default slowdown of the rate, as a fraction of the baseline, reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+# Programs looping over a simple counter: iterations are given in units of 4096 for lui
+LOOP_PROGRAM = """lui t0, {units}
+loop: addi t1, t1, 3
+xor t2, t2, t1
+addi t0, t0, -1
+bne t0, zero, loop
+beq zero, zero, 0
+"""
+
+# Read-modify-write of the 32 data words, indexed by the low bits of the counter
+MEMORY_PROGRAM = """lui s0, 16
+lui t0, {units}
+addi a0, zero, 27
+addi a1, zero, 25
+loop: sll t1, t0, a0
+srl t1, t1, a1
+add t2, s0, t1
+lw t3, 0(t2)
+addi t3, t3, 1
+sw t3, 0(t2)
+addi t0, t0, -1
+bne t0, zero, loop
+beq zero, zero, 0
+"""
+
+# Data-dependent branches on the sign of a xorshift generator
+BRANCH_PROGRAM = """lui t0, {units}
+addi s1, zero, 1
+addi a1, zero, 13
+addi a2, zero, 17
+addi a3, zero, 5
+loop: sll t1, s1, a1
+xor s1, s1, t1
+srl t1, s1, a2
+xor s1, s1, t1
+sll t1, s1, a3
+xor s1, s1, t1
+blt s1, zero, negative
+addi s2, s2, 1
+beq zero, zero, next
+negative: addi s3, s3, 1
+next: addi t0, t0, -1
+bne t0, zero, loop
+beq zero, zero, 0
+"""
+
+# Registers used by the generated assembly source
+SOURCE_REGISTERS = ["zero", "ra", "sp", "t0", "t1", "t2", "s0", "s1", "a0", "a1", "a2", "a3", "a4", "a5"]
+
+# Function to generate an assembly source of the given number of lines mixing every instruction format
+def generate_source(lines, seed=0):
+    rng = random.Random(seed)
+    reg = lambda: rng.choice(SOURCE_REGISTERS)
+    source = []
+    for index in range(lines):
+        label = f"l{index}: " if index % 8 == 0 else ""
+        # Branches only reach 4 KiB away, so they target one of the nearby labels
+        target = f"l{8 * max(0, min((lines - 1) // 8, index // 8 + rng.randint(-100, 100)))}"
+        kind = rng.randrange(8)
+        if kind < 3:
+            mnemonic = rng.choice(["add", "sub", "sll", "slt", "sltu", "xor", "srl", "or", "and"])
+            source.append(f"{label}{mnemonic} {reg()},{reg()},{reg()}")
+        elif kind == 3:
+            source.append(f"{label}addi {reg()},{reg()},{rng.randint(-2048, 2047)}")
+        elif kind == 4:
+            source.append(f"{label}lw {reg()},{4 * rng.randint(-64, 64)}({reg()})")
+        elif kind == 5:
+            source.append(f"{label}sw {reg()},{4 * rng.randint(-64, 64)}({reg()})")
+        elif kind == 6:
+            mnemonic = rng.choice(["beq", "bne", "blt", "bge", "bltu", "bgeu"])
+            source.append(f"{label}{mnemonic} {reg()},{reg()},{target}")
+        else:
+            source.append(f"{label}lui {reg()},{rng.randrange(1 << 20)}")
+    source.append("beq zero,zero,0")
+    return source
+
+# Function to time a callable, returning the seconds of every repetition after the warmup runs
+def measure(function, warmup, repeat):
+    for _ in range(warmup):
+        function()
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+    return seconds
+
+# Function to list the benchmarks as name -> (unit, setup) for a scale factor of the default sizes, where
+# setup() builds the benchmark only once it is selected and returns its (work, callable)
+def build_benchmarks(scale):
+    benchmarks = {}
+    lines = max(64, int(20000 * scale))
+
+    def setup_assemble():
+        source = generate_source(lines)
+        return lines + 1, lambda: Assembler().assemble(source)
+    benchmarks["assemble"] = ("lines/s", setup_assemble)
+
+    # Programs assembled and run once to count their steps, shared by their plain and translated runs
+    built = {}
+    def build(program, units):
+        if (program, units) not in built:
+            words = Assembler().assemble(program.format(units=units))
+            sim = Simulator(translate=False)
+            sim.load(words)
+            built[program, units] = (words, sim.run())
+        return built[program, units]
+
+    def setup_simulate(program, units, translate, traced=False):
+        words, steps = build(program, units)
+        return steps, lambda: simulate(words, translate, traced=traced)
+
+    units = max(1, int(16 * scale))
+    programs = {"loop": LOOP_PROGRAM, "memory": MEMORY_PROGRAM, "branch": BRANCH_PROGRAM}
+    for name, program in programs.items():
+        for translate in (False, True):
+            benchmarks[f"simulate-{name}" + ("-translated" if translate else "")] = (
+                "instructions/s", lambda program=program, translate=translate: setup_simulate(program, units, translate))
+
+    # Tracing every step to text dominates most real runs, so it gets its own benchmark
+    benchmarks["simulate-loop-traced"] = (
+        "instructions/s", lambda: setup_simulate(LOOP_PROGRAM, max(1, units // 8), False, traced=True))
+    return benchmarks
+
+# Function to run a program until it halts, optionally writing its text trace to the null device
+def simulate(words, translate, traced=False):
+    writer = TextTraceWriter(os.devnull, os.devnull) if traced else None
+    sim = Simulator(trace=writer, translate=translate)
+    sim.load(words)
+    sim.run()
+    if writer is not None:
+        writer.close()
+
+# Function to run the benchmarks whose name contains one of the filters, printing their rates
+def run_benchmarks(scale, warmup, repeat, filters):
+    results = {}
+    for name, (unit, setup) in build_benchmarks(scale).items():
+        if filters and not any(text in name for text in filters):
+            continue
+        work, function = setup()
+        seconds = measure(function, warmup, repeat)
+        rate = work / statistics.median(seconds)
+        results[name] = {"unit": unit, "work": work, "seconds": seconds, "rate": rate, "best_rate": work / min(seconds)}
+        print(f"{name:32} {rate:14,.0f} {unit}")
+    return {"version": RESULTS_VERSION, "python": platform.python_version(), "scale": scale, "benchmarks": results}
+
+# Function to compare results with a baseline, printing the change of every common benchmark
+# and returning the names of the ones slower than the baseline by more than threshold
+def compare(baseline, results, threshold):
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        old_rate = baseline["benchmarks"][name]["rate"]
+        change = result["rate"] / old_rate - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "REGRESSION"
+        print(f"{name:32} {old_rate:14,.0f} -> {result['rate']:14,.0f} {result['unit']:15} {change:+7.1%} {flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the assembler and the simulator")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results with a BASELINE results file")
+    parser.add_argument("--results", metavar="FILE", help="read the results from FILE instead of running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown reported as a regression, as a fraction (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before the timed ones (default 1)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs, the median one gives the rate (default 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="factor applied to the size of every benchmark")
+    parser.add_argument("filters", nargs="*", help="run only the benchmarks whose name contains one of these")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f_in:
+            results = json.load(f_in)
+    else:
+        results = run_benchmarks(args.scale, args.warmup, args.repeat, args.filters)
+
+    if args.output:
+        with open(args.output, "w") as f_out:
+            json.dump(results, f_out, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f_in:
+            baseline = json.load(f_in)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: " + ", ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
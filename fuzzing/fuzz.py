@@ -0,0 +1,299 @@
+# Differential fuzzing of the simulator: random programs are generated from the instructions the
+# assembler understands, assembled in-process and run by a reference simulator and a candidate one
+# inside a pool of workers, without spawning a process or touching a file per program. Programs
+# whose traces diverge are minimized line by line and written out as assembly sources.
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# The tools import their sibling modules, so their folders have to be importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SimpleAssembler"))
+sys.path.insert(0, os.path.join(ROOT, "SimpleSimulator"))
+
+from assembler import Assembler, AssemblyError
+from simulator import Simulator, STACK_SIZE, DATA_SIZE
+from trace_writer import ListTraceWriter
+
+# Configurations of the in-tree Simulator that can be checked against the plain interpreter
+CANDIDATES = {
+    "translated": {"translate": True},
+    "paged": {"paged_memory": True},
+    "paged-translated": {"translate": True, "paged_memory": True},
+}
+
+# Steps after which a program is stopped, generous enough for the bounded loops generated
+DEFAULT_MAX_STEPS = 10000
+
+# Registers the generated instructions read and write. s0 holds the data base address, sp the
+# stack pointer, s10 and s11 the loop counters and t6 the base of the jalr jumps, so they are
+# only written by the code that sets them up.
+REGISTERS = ["zero", "ra", "gp", "tp", "t0", "t1", "t2", "s1", "a0", "a1", "a2", "a3", "a4", "a5"]
+LOOP_COUNTERS = ["s11", "s10"]
+
+R_MNEMONICS = ["add", "sub", "sll", "slt", "sltu", "xor", "srl", "or", "and"]
+BRANCH_MNEMONICS = ["beq", "bne", "blt", "bge", "bltu", "bgeu"]
+
+# Interesting immediates besides small random ones
+EDGE_IMMEDIATES = [0, 1, -1, 31, 32, 2047, -2048]
+
+# Halt instruction ending every program
+HALT = "beq zero,zero,0"
+
+# Generator of random programs that always halt: loops are counted down from a small constant,
+# every other branch or jump goes forward, and loads and stores stay inside the data and stack windows
+class ProgramGenerator:
+    def __init__(self, seed, length):
+        self.rng = random.Random(seed)
+        self.length = length
+        self.labels = 0
+
+    def label(self):
+        self.labels += 1
+        return f"L{self.labels}"
+
+    def reg(self):
+        return self.rng.choice(REGISTERS)
+
+    def imm(self):
+        if self.rng.random() < 0.2:
+            return self.rng.choice(EDGE_IMMEDIATES)
+        return self.rng.randint(-64, 64)
+
+    # Function to generate one instruction that neither changes the control flow nor faults
+    def simple(self):
+        rng = self.rng
+        kind = rng.randrange(10)
+        if kind < 4:
+            return f"{rng.choice(R_MNEMONICS)} {self.reg()},{self.reg()},{self.reg()}"
+        if kind < 6:
+            return f"{rng.choice(['addi', 'sltiu'])} {self.reg()},{self.reg()},{self.imm()}"
+        if kind == 6:
+            return f"{rng.choice(['lui', 'auipc'])} {self.reg()},{rng.randrange(1 << 20)}"
+        # Word accesses at aligned offsets of the data window from s0, or the stack window below sp
+        if rng.random() < 0.5:
+            address = f"{4 * rng.randrange(DATA_SIZE // 4)}(s0)"
+        else:
+            address = f"{-4 * rng.randrange(STACK_SIZE // 4)}(sp)"
+        return f"{rng.choice(['lw', 'sw'])} {self.reg()},{address}"
+
+    # Function to generate count simple instructions followed by a labelled one, the target of a forward jump
+    def skipped(self, count):
+        label = self.label()
+        return [self.simple() for _ in range(count)] + [f"{label}: {self.simple()}"], label
+
+    # Function to generate about length lines of code at the given loop depth
+    def block(self, length, depth):
+        rng = self.rng
+        lines = []
+        while len(lines) < length:
+            kind = rng.randrange(20)
+            if kind < 13:
+                lines.append(self.simple())
+            elif kind < 16:
+                body, label = self.skipped(rng.randint(0, 3))
+                lines.append(f"{rng.choice(BRANCH_MNEMONICS)} {self.reg()},{self.reg()},{label}")
+                lines.extend(body)
+            elif kind == 16:
+                body, label = self.skipped(rng.randint(0, 3))
+                lines.append(f"jal {self.reg()},{label}")
+                lines.extend(body)
+            elif kind == 17:
+                # auipc gives the address of the jalr's predecessor, so the offset skips both and count more
+                count = rng.randint(0, 3)
+                lines.append("auipc t6,0")
+                lines.append(f"jalr {self.reg()},t6,{4 * (count + 2)}")
+                lines.extend(self.skipped(count)[0])
+            elif depth < len(LOOP_COUNTERS):
+                counter = LOOP_COUNTERS[depth]
+                label = self.label()
+                body = self.block(rng.randint(1, max(1, length // 3)), depth + 1)
+                lines.append(f"addi {counter},zero,{rng.randint(1, 8)}")
+                lines.append(f"{label}: {body[0]}")
+                lines.extend(body[1:])
+                lines.append(f"addi {counter},{counter},-1")
+                lines.append(f"bne {counter},zero,{label}")
+        return lines
+
+    # Function to generate a whole program: the base registers, the code and the halt instruction.
+    # Its length varies between half and twice the requested one, so that programs longer than 64
+    # instructions overlap the stack window at 0x100, which the stack region must shadow.
+    def program(self):
+        return ["lui s0,16"] + self.block(self.rng.randint(self.length // 2, 2 * self.length), 0) + [HALT]
+
+# Function to generate the program of a seed
+def generate(seed, length):
+    return ProgramGenerator(seed, length).program()
+
+# Function to load the Simulator class of a simulator module outside the tree, whose folder becomes importable
+def load_module_simulator(path):
+    path = os.path.abspath(path)
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location("candidate_simulator", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Simulator
+
+# Function to build the factory creating candidate simulators: a configuration of CANDIDATES, or the
+# Simulator class of a module file, constructed with a trace sink like the in-tree one
+def candidate_factory(candidate, module_path=None):
+    if module_path:
+        simulator_class = load_module_simulator(module_path)
+        return lambda trace: simulator_class(trace=trace)
+    options = CANDIDATES[candidate]
+    return lambda trace: Simulator(trace=trace, **options)
+
+# Function to run a program on a simulator, returning everything the traces of the grader would show:
+# the states, the data memory, the fault message and the number of steps (or the exception raised)
+def outcome(factory, words, max_steps):
+    trace = ListTraceWriter()
+    try:
+        sim = factory(trace)
+        sim.load(words)
+        sim.run(max_steps)
+        sim.write_final_state(trace)
+    except Exception as error:
+        return {"error": repr(error)}
+    return {"states": trace.states, "memory": trace.memory, "fault": str(getattr(sim, "fault", None)),
+            "steps": getattr(sim, "steps", None)}
+
+# Function to describe the first difference between the outcomes of the reference and the candidate,
+# or return None when they match
+def divergence(reference, candidate):
+    if "error" in candidate or "error" in reference:
+        if reference == candidate:
+            return None
+        return f"reference {reference.get('error', 'ran')}, candidate {candidate.get('error', 'ran')}"
+    for index, (expected, actual) in enumerate(zip(reference["states"], candidate["states"])):
+        if expected != actual:
+            pc, registers = expected
+            other_pc, other_registers = actual
+            changed = [f"x{n}: 0x{registers[n]:08X} != 0x{other_registers[n]:08X}"
+                       for n in range(len(registers)) if registers[n] != other_registers[n]]
+            if pc != other_pc:
+                changed.insert(0, f"pc: 0x{pc:08X} != 0x{other_pc:08X}")
+            return f"step {index + 1}: " + ", ".join(changed)
+    for key in ("states", "memory", "fault", "steps"):
+        if reference[key] != candidate[key]:
+            if key == "states":
+                return f"{len(reference['states'])} trace rows != {len(candidate['states'])}"
+            return f"{key}: {reference[key]} != {candidate[key]}"
+    return None
+
+# Function to check whether a program diverges, returning the description of the divergence
+# (None when the traces match or when the source does not assemble)
+def check(assembler, factory, source, max_steps):
+    try:
+        words = assembler.assemble(source)
+    except AssemblyError:
+        return None
+    return divergence(outcome(reference_factory, words, max_steps), outcome(factory, words, max_steps))
+
+# Reference simulator: the plain interpreter
+reference_factory = lambda trace: Simulator(trace=trace)
+
+# State of a worker process, set once by init_worker instead of being sent with every chunk
+worker = {}
+
+# Function to set up a worker process with its assembler and candidate factory
+def init_worker(candidate, module_path):
+    worker["assembler"] = Assembler()
+    worker["factory"] = candidate_factory(candidate, module_path)
+
+# Function to fuzz the programs of a chunk of seeds in a worker, returning the number of programs
+# run and the (seed, divergence) pairs found
+def fuzz_chunk(seeds, length, max_steps):
+    found = []
+    for seed in seeds:
+        description = check(worker["assembler"], worker["factory"], generate(seed, length), max_steps)
+        if description is not None:
+            found.append((seed, description))
+    return len(seeds), found
+
+# Function to shrink a diverging source by removing chunks of lines, halving the chunk size whenever no
+# chunk can go, as long as the program still assembles and diverges. The halt instruction is kept.
+def minimize(assembler, factory, source, max_steps):
+    lines = source[:-1]
+    size = max(1, len(lines) // 2)
+    while True:
+        start = 0
+        while start < len(lines):
+            trial = lines[:start] + lines[start + size:]
+            if check(assembler, factory, trial + source[-1:], max_steps) is not None:
+                lines = trial
+            else:
+                start += size
+        if size == 1:
+            break
+        size = max(1, size // 2)
+    return lines + source[-1:]
+
+# Function to split the seeds to fuzz into chunks sent to the workers
+def chunks(first, count, size):
+    for start in range(first, first + count, size):
+        yield range(start, min(first + count, start + size))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a candidate simulator with the reference one on random programs")
+    parser.add_argument("--programs", type=int, default=1000, help="number of programs to generate (default 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first program, the others follow it (default 0)")
+    parser.add_argument("--length", type=int, default=40, help="approximate number of instructions per program (default 40)")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                        help=f"steps after which a program is stopped (default {DEFAULT_MAX_STEPS})")
+    parser.add_argument("--candidate", choices=sorted(CANDIDATES), default="translated",
+                        help="configuration of the in-tree simulator to check (default translated)")
+    parser.add_argument("--candidate-module", metavar="FILE",
+                        help="check the Simulator class of a simulator module instead, constructed as Simulator(trace=sink)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk", type=int, default=50, help="programs sent to a worker at once (default 50)")
+    parser.add_argument("--output-dir", default="fuzz_failures", help="directory receiving the minimized diverging programs")
+    parser.add_argument("--max-failures", type=int, default=10, help="diverging programs to minimize and write (default 10)")
+    parser.add_argument("--no-minimize", action="store_true", help="write the diverging programs as generated")
+    args = parser.parse_args(argv)
+
+    # Random programs loop, so every run needs a budget
+    if args.max_steps <= 0:
+        parser.error("--max-steps must be positive")
+
+    started = time.perf_counter()
+    failures = []
+    done = 0
+    work = chunks(args.seed, args.programs, args.chunk)
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                 initargs=(args.candidate, args.candidate_module)) as pool:
+            results = pool.map(fuzz_chunk, work, repeat(args.length), repeat(args.max_steps))
+            for count, found in results:
+                done += count
+                failures.extend(found)
+    else:
+        init_worker(args.candidate, args.candidate_module)
+        for seeds in work:
+            count, found = fuzz_chunk(seeds, args.length, args.max_steps)
+            done += count
+            failures.extend(found)
+    elapsed = time.perf_counter() - started
+    print(f"{done} programs in {elapsed:.1f}s ({60 * done / elapsed:,.0f}/min), {len(failures)} diverging")
+
+    if not failures:
+        return
+    init_worker(args.candidate, args.candidate_module)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for seed, description in failures[:args.max_failures]:
+        source = generate(seed, args.length)
+        if not args.no_minimize:
+            source = minimize(worker["assembler"], worker["factory"], source, args.max_steps)
+            description = check(worker["assembler"], worker["factory"], source, args.max_steps)
+        path = os.path.join(args.output_dir, f"seed_{seed}.s")
+        with open(path, "w") as f_out:
+            f_out.write("\n".join(source) + "\n")
+        print(f"seed {seed}: {len(source)} lines, {description} -> {path}")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Checks of the assembler, run with: python -m pytest tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SimpleAssembler"))
+
+import pytest
+
+import assembler
+
+TESTS = os.path.join(ROOT, "automatedTesting", "tests", "assembly")
+
+def test_incremental_reassembly_of_edited_repeated_line(tmp_path, monkeypatch):
+    with open(os.path.join(TESTS, "simpleBin", "simple_13.txt")) as f_in:
+        source = f_in.read()
+    with open(os.path.join(TESTS, "bin_s", "simple_13.txt")) as f_in:
+        expected = f_in.read()
+    program = str(tmp_path / "program.txt")
+    cache = str(tmp_path / "program.cache")
+
+    (tmp_path / "program.txt").write_text(source)
+    assembler.main([program, str(tmp_path / "first.txt"), "--cache", cache])
+    assert (tmp_path / "first.txt").read_text().split() == expected.split()
+
+    # The repeated lines keep their own encodings, so the unchanged source leaves the cache as it is
+    saves = []
+    monkeypatch.setattr(assembler.IncrementalAssembler, "save", lambda self: saves.append(self))
+    assembler.main([program, str(tmp_path / "again.txt"), "--cache", cache])
+    assert not saves
+    monkeypatch.undo()
+
+    # Editing the first of the two "bne t0,t1,loop" lines, the second one becomes the first occurrence
+    edited = source.replace("bne t0,t1,loop", "bne t0,t2,loop", 1)
+    assert edited != source
+    (tmp_path / "program.txt").write_text(edited)
+    assembler.main([program, str(tmp_path / "incremental.txt"), "--cache", cache])
+    assembler.main([program, str(tmp_path / "full.txt")])
+    assert (tmp_path / "incremental.txt").read_text() == (tmp_path / "full.txt").read_text()
+
+def test_incremental_assembler_reads_generator_source_once():
+    program = ["addi t0,zero,1", "beq zero,zero,0"]
+    assert assembler.IncrementalAssembler().assemble(line for line in program) == assembler.Assembler().assemble(program)
+
+    # Sources falling back to a full assembly, with an error or with data
+    with pytest.raises(assembler.AssemblyError):
+        assembler.IncrementalAssembler().assemble(line for line in ["frob t0,t1", "beq zero,zero,0"])
+    with pytest.raises(assembler.AssemblyError):
+        assembler.IncrementalAssembler().assemble(line for line in ["beq zero,zero,missing", "beq zero,zero,0"])
+    data = [".data", "table: .word 1, 2", ".text", "lw t0,table(zero)", "beq zero,zero,0"]
+    incremental = assembler.IncrementalAssembler()
+    assert incremental.assemble(line for line in data) == assembler.Assembler().assemble(data)
+    assert incremental.data == bytes([1, 0, 0, 0, 2, 0, 0, 0])
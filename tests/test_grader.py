@@ -0,0 +1,70 @@
+# Checks of the grading harness, run with: python -m pytest tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "automatedTesting", "src"))
+sys.path.insert(0, os.path.join(ROOT, "SimpleSimulator"))
+
+import struct
+
+from Cache import ResultCache
+from Grader import Grader
+from trace_writer import DeltaTraceWriter
+
+# Tool writing the expected output and then crashing
+CRASHING_TOOL = """import sys
+with open(sys.argv[2], "w") as f_out:
+    f_out.write("0\\n")
+sys.exit(1)
+"""
+
+def test_failed_tool_runs_are_not_cached(tmp_path):
+    (tmp_path / "Tool.py").write_text(CRASHING_TOOL)
+    (tmp_path / "input.txt").write_text("input\n")
+    (tmp_path / "expected.txt").write_text("0\n")
+    output = str(tmp_path / "output.txt")
+    tasks = [(str(tmp_path), "Tool.py", [str(tmp_path / "input.txt"), output], False)]
+
+    for _ in range(2):
+        grader = Grader(False, True, "linux", cache=ResultCache(str(tmp_path / "cache")))
+        (error, passed, cached), = grader.runTasks(tasks, [[output]], [str(tmp_path / "expected.txt")])
+        assert error == "Tool.py: exited with 1"
+        assert not cached
+
+# Function to write a delta trace of rows rows, all of them keyframes
+def write_delta_trace(path, compression, rows):
+    writer = DeltaTraceWriter(path, compression, keyframe_interval=1)
+    registers = [0] * 32
+    for step in range(rows):
+        registers[5] = step
+        writer.write_state(4 * step, registers)
+    writer.close()
+
+def test_corrupt_delta_traces_fail_their_comparison(tmp_path):
+    # Longer than the buffer gzip decompresses ahead, so that the damage is met after the header
+    expected = str(tmp_path / "expected.bin")
+    write_delta_trace(expected, "none", 3000)
+    with open(expected, "rb") as f_in:
+        trace = f_in.read()
+    grader = Grader(False, True, "linux")
+    assert grader.diffFiles(expected, expected)
+
+    # An unknown record kind after every row of the expected trace
+    (tmp_path / "kind.bin").write_bytes(trace + b"\x07")
+    assert not grader.diffFiles(str(tmp_path / "kind.bin"), expected)
+
+    # Stored deflate blocks holding the trace, followed by a block of an invalid type
+    blocks = b""
+    for start in range(0, len(trace), 0xFFFF):
+        chunk = trace[start:start + 0xFFFF]
+        blocks += b"\x00" + struct.pack("<HH", len(chunk), len(chunk) ^ 0xFFFF) + chunk
+    (tmp_path / "deflate.gz").write_bytes(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff" + blocks + b"\x07")
+    assert not grader.diffFiles(str(tmp_path / "deflate.gz"), expected)
+
+    # Damaged data right after the gzip header, which is then not recognized as a delta trace
+    write_delta_trace(str(tmp_path / "good.gz"), "gzip", 4)
+    data = bytearray((tmp_path / "good.gz").read_bytes())
+    data[20:-8] = bytes(len(data) - 28)
+    (tmp_path / "header.gz").write_bytes(bytes(data))
+    assert not grader.diffFiles(str(tmp_path / "header.gz"), str(tmp_path / "good.gz"))
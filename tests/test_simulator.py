@@ -0,0 +1,108 @@
+# Checks of the Simulator class, run with: python -m pytest tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "SimpleSimulator"))
+sys.path.insert(0, os.path.join(ROOT, "SimpleAssembler"))
+
+from assembler import Assembler
+import pytest
+
+from checkpoint import find_checkpoint, run_checkpointed
+from memory import MemoryFault
+from simulator import DATA_BASE, DATA_SIZE, Simulator, data_memory_size
+
+# Endless loop incrementing t0, hot enough for its block to be translated
+LOOP = """addi t0,zero,0
+loop: addi t0,t0,1
+addi t1,t0,2
+beq zero,zero,loop
+"""
+
+# Trace sink keeping every reported state
+class Recorder:
+    def __init__(self):
+        self.states = []
+
+    def write_state(self, pc, registers):
+        self.states.append((pc, list(registers)))
+
+    def write_memory(self, base, words):
+        pass
+
+def loop_machine(**options):
+    sim = Simulator(**options)
+    sim.load(Assembler().assemble(LOOP))
+    return sim
+
+def test_translated_run_follows_trace_sink_changes():
+    reference = Recorder()
+    loop_machine(trace=reference).run(150)
+
+    # Dropping the sink of a machine whose blocks were translated with tracing on
+    recorder = Recorder()
+    sim = loop_machine(trace=recorder, translate=True)
+    assert sim.run(50) == 50
+    sim.trace = None
+    assert sim.run(50) == 50
+    # Attaching a sink to blocks translated without one
+    sim.trace = recorder
+    assert sim.run(50) == 50
+    assert recorder.states == reference.states[:50] + reference.states[100:]
+
+def test_checkpoint_is_not_resumed_onto_another_program(tmp_path):
+    path = str(tmp_path / "loop.ck")
+    sim = loop_machine()
+    run_checkpointed(sim, 100, path, interval=10)
+    assert find_checkpoint(path, 55, sim.program_hash).steps == 50
+
+    other = Simulator()
+    other.load(Assembler().assemble(LOOP.replace("addi t1,t0,2", "addi t1,t0,3")))
+    with pytest.raises(ValueError):
+        find_checkpoint(path, program=other.program_hash)
+
+# A taken branch to pc + 4 and a branch not taken, before the halt
+SHORT_BRANCHES = """beq zero,zero,4
+bne zero,zero,8
+addi t0,zero,1
+beq zero,zero,0
+"""
+
+def test_profiler_counts_taken_branch_to_next_instruction():
+    sim = Simulator(profile=True)
+    sim.load(Assembler().assemble(SHORT_BRANCHES))
+    sim.run()
+    assert sim.profiler.branches == {0: [1, 0], 4: [0, 1]}
+
+def test_predictor_trained_on_taken_branch_to_next_instruction():
+    sim = Simulator(microarch={"predictor": "bimodal"})
+    sim.load(Assembler().assemble(SHORT_BRANCHES))
+    sim.run()
+    # The counters start weakly not taken, so only the taken branch is mispredicted
+    assert (sim.perf_model.predictor.predictions, sim.perf_model.predictor.mispredictions) == (2, 1)
+
+def test_performance_summary_without_branches():
+    sim = Simulator(microarch={})
+    sim.load(Assembler().assemble("addi t0,zero,1\nbeq zero,zero,0\n"))
+    sim.run()
+    assert "(n/a accuracy)" in sim.perf_model.summary()
+
+def test_data_image_at_high_address_gets_its_own_region(tmp_path):
+    image = tmp_path / "image.bin"
+    image.write_bytes(bytes([1, 0, 0, 0, 2, 0, 0, 0]))
+    images = [(str(image), 0xF0000000), (str(image), DATA_BASE + DATA_SIZE)]
+    data_size = data_memory_size(images)
+    assert data_size == DATA_SIZE + 8
+
+    sim = Simulator(data_size=data_size)
+    sim.load(Assembler().assemble("beq zero,zero,0"))
+    for path, address in images:
+        sim.load_data(address, image.read_bytes())
+    assert sim.memory.region("data").size == DATA_SIZE + 8
+    assert sim.memory.region("image 0xF0000000").size == 8
+    assert [sim.read_word(0xF0000000), sim.read_word(0xF0000004), sim.read_word(DATA_BASE + DATA_SIZE + 4)] == [1, 2, 2]
+
+    # An image straddling the end of the stack fits in no region of the flat memory
+    with pytest.raises(MemoryFault):
+        sim.load_data(0x17C, image.read_bytes())